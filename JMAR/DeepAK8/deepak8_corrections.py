@@ -5,54 +5,66 @@ from correctionlib.schemav2 import Correction, Binning, Category, Formula, Corre
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import helperfunctionsv2 as hf
+import sfcache
 import gzip
 
 bprintouts=False
 
-infile = 'DeepAK8V2_Top_W_SFs.csv'
-print("Read in "+infile)
-
-data = pd.read_csv(infile, names=['Object','Year','version','MistaggingRate','pT_low','pT_high','SF','SF_lowerErr','SF_upperErr'],skipinitialspace=True)
-
-data = data.iloc[1: , :]
-if bprintouts: 
-    print("Head of the CSV file that is read in")
-    print(data.head())
 
+#### build targets: arguments of create_corr, the files they write and the input files they read (used by jsonformat.py in the top directory)
+targets = [
+    {"args": ["Top", "2016"], "outputs": ["2016_DeepAK8_Top.json"], "inputs": ["DeepAK8V2_Top_W_SFs.csv"]},
+    {"args": ["W", "2016"], "outputs": ["2016_DeepAK8_W.json"], "inputs": ["DeepAK8V2_Top_W_SFs.csv"]},
+    {"args": ["Top", "2017"], "outputs": ["2017_DeepAK8_Top.json"], "inputs": ["DeepAK8V2_Top_W_SFs.csv"]},
+    {"args": ["W", "2017"], "outputs": ["2017_DeepAK8_W.json"], "inputs": ["DeepAK8V2_Top_W_SFs.csv"]},
+    {"args": ["Top", "2018"], "outputs": ["2018_DeepAK8_Top.json"], "inputs": ["DeepAK8V2_Top_W_SFs.csv"]},
+    {"args": ["W", "2018"], "outputs": ["2018_DeepAK8_W.json"], "inputs": ["DeepAK8V2_Top_W_SFs.csv"]},
+]
 
+infile = 'DeepAK8V2_Top_W_SFs.csv'
 
-dataInfo = OrderedDict()
-dataInfo['Object'] = data.Object.values.tolist()
-dataInfo['workingPoint'] = data.MistaggingRate.values.tolist()
-dataInfo['year'] = data.Year.values.tolist()
-dataInfo['valueType'] = data.version.values.tolist()
-dataInfo['ptMin'] = data.pT_low.values.tolist()
-dataInfo['ptMax'] = data.pT_high.values.tolist()
-dataInfo['etaMin'] = ["-2.4" for el in data.pT_high.values.tolist()]
-dataInfo['etaMax'] = ["2.4" for el in data.pT_high.values.tolist()]
-dataInfo['scaleFactor'] = data.SF.values.tolist()
-dataInfo['scaleFactorSystUncty_up'] = data.SF_lowerErr.values.tolist()
-dataInfo['scaleFactorSystUncty_down'] = data.SF_upperErr.values.tolist()
+#### reads the SF table from the csv file (cached in .sfcache, see sfcache.py)
+def extract_table():
+    print("Read in "+infile)
 
+    data = pd.read_csv(infile, names=['Object','Year','version','MistaggingRate','pT_low','pT_high','SF','SF_lowerErr','SF_upperErr'],skipinitialspace=True)
 
+    data = data.iloc[1: , :]
+    if bprintouts: 
+        print("Head of the CSV file that is read in")
+        print(data.head())
+
+    dataInfo = OrderedDict()
+    dataInfo['Object'] = data.Object.values.tolist()
+    dataInfo['workingPoint'] = data.MistaggingRate.values.tolist()
+    dataInfo['year'] = data.Year.values.tolist()
+    dataInfo['valueType'] = data.version.values.tolist()
+    dataInfo['ptMin'] = data.pT_low.values.tolist()
+    dataInfo['ptMax'] = data.pT_high.values.tolist()
+    dataInfo['etaMin'] = ["-2.4" for el in data.pT_high.values.tolist()]
+    dataInfo['etaMax'] = ["2.4" for el in data.pT_high.values.tolist()]
+    dataInfo['scaleFactor'] = data.SF.values.tolist()
+    dataInfo['scaleFactorSystUncty_up'] = data.SF_lowerErr.values.tolist()
+    dataInfo['scaleFactorSystUncty_down'] = data.SF_upperErr.values.tolist()
 
+    df = pd.DataFrame( dataInfo )
+    df['ptMin'] = df['ptMin'].astype(int)
+    df['ptMax'] = df['ptMax'].astype(int)
+    df['scaleFactor'] = df['scaleFactor'].astype(float)
+    df['scaleFactorSystUncty_up'] = df['scaleFactorSystUncty_up'].astype(float)
+    df['scaleFactorSystUncty_down'] = df['scaleFactorSystUncty_down'].astype(float)
+    return df
 
 
 #csv file has two particle W and top
 def create_corr(particle="Top",year_="2016"):
 
+    df = sfcache.cached_table("DeepAK8", [infile], extract_table)
     if "17" in year_ or "18" in year_:
-        dataInfo['etaMin'] = ["-2.5" for el in data.pT_high.values.tolist()]
-        dataInfo['etaMax'] = ["2.5" for el in data.pT_high.values.tolist()]
+        df['etaMin'] = "-2.5"
+        df['etaMax'] = "2.5"
         
 
-    df = pd.DataFrame( dataInfo )
-    df['ptMin'] = df['ptMin'].astype(int)
-    df['ptMax'] = df['ptMax'].astype(int)
-    df['scaleFactor'] = df['scaleFactor'].astype(float)
-    df['scaleFactorSystUncty_up'] = df['scaleFactorSystUncty_up'].astype(float)
-    df['scaleFactorSystUncty_down'] = df['scaleFactorSystUncty_down'].astype(float)
-
     if bprintouts: 
         print("Printing the data structure")
         print(df)
@@ -95,34 +107,36 @@ def create_corr(particle="Top",year_="2016"):
         "corrections": [
             correction_dict[key] for key in correction_dict    ]
     })
-    cset.json()
-    with open(year_+'_DeepAK8_'+particle+'.json', "w") as fout:
-        fout.write(cset.json(exclude_unset=True, indent=4))
+    outfile = year_+'_DeepAK8_'+particle+'.json'
+    cset = hf.add_int_categories(cset)
+    nbytes = hf.write_cset(cset, outfile)
+    print("written "+outfile+" ("+str(nbytes)+" bytes)")
+    return cset
         
     
 
-create_corr("Top", "2016")
-create_corr("W","2016")
-
-create_corr("Top","2017")
-create_corr("W","2017")
+if __name__ == "__main__":
+    create_corr("Top", "2016")
+    create_corr("W","2016")
 
-create_corr("Top","2018")
-create_corr("W","2018")
+    create_corr("Top","2017")
+    create_corr("W","2017")
 
+    create_corr("Top","2018")
+    create_corr("W","2018")
 
 
-from correctionlib import _core
 
-#Download the correct JSON files 
-evaluator = _core.CorrectionSet.from_file('2016_DeepAK8_Top.json')
+    from correctionlib import _core
 
-valsf= evaluator["DeepAK8_Top_Nominal"].evaluate(2.0,450.,"nom","0p1")
-print("sf is:"+str(valsf))
+    #Download the correct JSON files 
+    evaluator = _core.CorrectionSet.from_file('2016_DeepAK8_Top.json')
 
-valsf= evaluator["DeepAK8_Top_Nominal"].evaluate(2.0,450.,"up","0p1")
-print("sf up is:"+str(valsf))
+    valsf= evaluator["DeepAK8_Top_Nominal"].evaluate(2.0,450.,"nom","0p1")
+    print("sf is:"+str(valsf))
 
-valsf= evaluator["DeepAK8_Top_Nominal"].evaluate(2.0,450.,"down","0p1")
-print("sf down is:"+str(valsf))
+    valsf= evaluator["DeepAK8_Top_Nominal"].evaluate(2.0,450.,"up","0p1")
+    print("sf up is:"+str(valsf))
 
+    valsf= evaluator["DeepAK8_Top_Nominal"].evaluate(2.0,450.,"down","0p1")
+    print("sf down is:"+str(valsf))
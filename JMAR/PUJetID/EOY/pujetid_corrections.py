@@ -3,18 +3,26 @@ import numpy as np
 from collections import OrderedDict
 from correctionlib.schemav2 import Correction, Binning, Category, Formula, CorrectionSet
 import os, sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 import helperfunctionsv2 as hf
+import histreader as hr
 import gzip
-import ROOT
 
 bprintouts=False
 
+
+#### build targets: arguments of create_corr, the files they write and the input files they read (used by jsonformat.py in the top directory)
+targets = [
+    {"args": ["2016"], "outputs": ["2016_PUJetID.json"], "inputs": ["PUID_80XTraining_EffSFandUncties.root"]},
+    {"args": ["2017"], "outputs": ["2017_PUJetID.json"], "inputs": ["PUID_80XTraining_EffSFandUncties.root"]},
+    {"args": ["2018"], "outputs": ["2018_PUJetID.json"], "inputs": ["PUID_80XTraining_EffSFandUncties.root"]},
+]
+
 infile = "PUID_80XTraining_EffSFandUncties.root"
 
 def create_corr(year= "2016"):
     print("working on "+infile)
-    inputFile = ROOT.TFile.Open(infile)
+    inputFile = hr.open_file(infile)
 
     correction_dict = {}
     for imiseff in range(2):
@@ -23,12 +31,12 @@ def create_corr(year= "2016"):
         
         listOfHistos = []
         if bprintouts: print("List of Workingpoints that are considered")
-        for i in inputFile.GetListOfKeys(): 
-            if "sf" not in i.GetName(): continue
-            if "uncty" in i.GetName(): continue
-            if year not in i.GetName(): continue
-            if miseff not in i.GetName(): continue
-            listOfHistos.append(i.GetName())
+        for i in inputFile.keys(): 
+            if "sf" not in i: continue
+            if "uncty" in i: continue
+            if year not in i: continue
+            if miseff not in i: continue
+            listOfHistos.append(i)
             if bprintouts: print(i)
    
         dataInfo = OrderedDict()
@@ -42,34 +50,26 @@ def create_corr(year= "2016"):
         dataInfo['scaleFactorSystUncty_up'] = []
         dataInfo['scaleFactorSystUncty_down'] = []
         
-        tmpHistos ={}
-        tmpHistos_up ={}
-        tmpHistos_down ={}
         for ih in listOfHistos:
             
-            tmpHistos[ih] = inputFile.Get(ih)
-            tmpHistos_up[ih] = inputFile.Get(ih+"_Systuncty")
-            tmpHistos_down[ih] = inputFile.Get(ih+"_Systuncty")
+            hist = inputFile.hist(ih)
+            hist_unc = inputFile.hist(ih+"_Systuncty")
             
             wp =ih.split('_')[-1:][0]
             print(wp)
             
-    
-            for ix in range( tmpHistos[ih].GetNbinsX()+2 ):      #### plus 2 for overflows
-                for iy in range(tmpHistos[ih].GetNbinsY()+2):
-                    dataInfo['workingPoint'].append(wp)
-                    dataInfo['ptMin'].append(tmpHistos[ih].GetXaxis().GetBinLowEdge(ix) )
-                    dataInfo['ptMax'].append(tmpHistos[ih].GetXaxis().GetBinUpEdge(ix) )
-                    dataInfo['etaMin'].append(tmpHistos[ih].GetYaxis().GetBinLowEdge(iy) )
-                    dataInfo['etaMax'].append(tmpHistos[ih].GetYaxis().GetBinUpEdge(iy) )
-    
-                    if tmpHistos[ih].GetXaxis().GetBinLowEdge(ix) >= 50:
-                        dataInfo['scaleFactor'].append(1 )
-                    else:
-                        dataInfo['scaleFactor'].append(tmpHistos[ih].GetBinContent(ix,iy) )
-                    dataInfo['Object'].append(ih )
-                    dataInfo['scaleFactorSystUncty_up'].append(tmpHistos_up[ih].GetBinContent(ix,iy) )
-                    dataInfo['scaleFactorSystUncty_down'].append(tmpHistos_down[ih].GetBinContent(ix,iy) )
+            #### all bins including the overflows (x runs slowest, as in the GetBinContent(ix,iy) loops before)
+            ptMin, etaMin = [a.ravel() for a in np.meshgrid(hist.lows[0], hist.lows[1], indexing="ij")]
+            ptMax, etaMax = [a.ravel() for a in np.meshgrid(hist.ups[0], hist.ups[1], indexing="ij")]
+            dataInfo['workingPoint'].extend([wp]*len(ptMin))
+            dataInfo['ptMin'].extend(ptMin)
+            dataInfo['ptMax'].extend(ptMax)
+            dataInfo['etaMin'].extend(etaMin)
+            dataInfo['etaMax'].extend(etaMax)
+            dataInfo['scaleFactor'].extend(np.where(ptMin >= 50, 1, hist.values.ravel()))
+            dataInfo['Object'].extend([ih]*len(ptMin))
+            dataInfo['scaleFactorSystUncty_up'].extend(hist_unc.values.ravel())
+            dataInfo['scaleFactorSystUncty_down'].extend(hist_unc.values.ravel())
             
             
         df = pd.DataFrame( dataInfo )
@@ -109,33 +109,36 @@ def create_corr(year= "2016"):
         "corrections": [
             correction_dict[key] for key in correction_dict    ]
     })
-    cset.json()
-    with open(year+'_PUJetID.json', "w") as fout:
-        fout.write(cset.json(exclude_unset=True, indent=4))
+    outfile = year+'_PUJetID.json'
+    cset = hf.add_int_categories(cset)
+    nbytes = hf.write_cset(cset, outfile)
+    print("written "+outfile+" ("+str(nbytes)+" bytes)")
+    return cset
  
 
 
-create_corr("2016")
-create_corr("2017")
-create_corr("2018")
+if __name__ == "__main__":
+    create_corr("2016")
+    create_corr("2017")
+    create_corr("2018")
 
 
-from correctionlib import _core
+    from correctionlib import _core
 
-#Download the correct JSON files 
-evaluator = _core.CorrectionSet.from_file('2016_PUJetID.json')
+    #Download the correct JSON files 
+    evaluator = _core.CorrectionSet.from_file('2016_PUJetID.json')
 
-valsf= evaluator["PUJetID_eff"].evaluate(-4.5,20.,"nom","L")
-print("sf is:"+str(valsf))
+    valsf= evaluator["PUJetID_eff"].evaluate(-4.5,20.,"nom","L")
+    print("sf is:"+str(valsf))
 
-valsf= evaluator["PUJetID_eff"].evaluate(-4.5,20.,"up","L")
-print("sf up is:"+str(valsf))
+    valsf= evaluator["PUJetID_eff"].evaluate(-4.5,20.,"up","L")
+    print("sf up is:"+str(valsf))
 
-valsf= evaluator["PUJetID_eff"].evaluate(-4.5,20.,"down","L")
-print("sf down is:"+str(valsf))
+    valsf= evaluator["PUJetID_eff"].evaluate(-4.5,20.,"down","L")
+    print("sf down is:"+str(valsf))
 
-valsf= evaluator["PUJetID_eff"].evaluate(-4.5,50.,"nom","L")
-print("sf is:"+str(valsf))
+    valsf= evaluator["PUJetID_eff"].evaluate(-4.5,50.,"nom","L")
+    print("sf is:"+str(valsf))
 
-valsf= evaluator["PUJetID_eff"].evaluate(-4.5,53.,"nom","L")
-print("sf is:"+str(valsf))
+    valsf= evaluator["PUJetID_eff"].evaluate(-4.5,53.,"nom","L")
+    print("sf is:"+str(valsf))
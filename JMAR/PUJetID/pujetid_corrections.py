@@ -5,83 +5,90 @@ from correctionlib.schemav2 import Correction, Binning, Category, Formula, Corre
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import helperfunctionsv2 as hf
+import histreader as hr
+import sfcache
 import gzip
-import ROOT
 
 bprintouts=False
 
+
+#### build targets: arguments of create_corr, the files they write and the input files they read (used by jsonformat.py in the top directory)
+targets = [
+    {"args": ["UL2016_"], "outputs": ["UL2016__PUJetID.json"], "inputs": ["PUID_106XTraining_ULRun2_EffSFandUncties_v1.root"]},
+    {"args": ["UL2016APV"], "outputs": ["UL2016APV_PUJetID.json"], "inputs": ["PUID_106XTraining_ULRun2_EffSFandUncties_v1.root"]},
+    {"args": ["UL2017"], "outputs": ["UL2017_PUJetID.json"], "inputs": ["PUID_106XTraining_ULRun2_EffSFandUncties_v1.root"]},
+    {"args": ["UL2018"], "outputs": ["UL2018_PUJetID.json"], "inputs": ["PUID_106XTraining_ULRun2_EffSFandUncties_v1.root"]},
+]
+
 infile = "PUID_106XTraining_ULRun2_EffSFandUncties_v1.root"
 
-def create_corr(year= "2016"):
+#### reads the SF table of one year from the root file (cached in .sfcache, see sfcache.py)
+def extract_table(year, miseff):
     print("working on "+infile)
-    inputFile = ROOT.TFile.Open(infile)
+    inputFile = hr.open_file(infile)
+
+    listOfHistos = []
+    if bprintouts: print("List of Workingpoints that are considered")
+    for i in inputFile.keys(): 
+        if "sf" not in i: continue
+        if "uncty" in i: continue
+        if year not in i: continue
+        if miseff not in i: continue
+        listOfHistos.append(i)
+        if bprintouts: print(i)
+   
+    dataInfo = OrderedDict()
+    dataInfo['Object'] = []
+    dataInfo['workingPoint'] = []
+    dataInfo['ptMin'] = []
+    dataInfo['ptMax'] = []
+    dataInfo['etaMin'] = []
+    dataInfo['etaMax'] = []
+    dataInfo['scaleFactor'] = []
+    dataInfo['scaleFactorSystUncty_up'] = []
+    dataInfo['scaleFactorSystUncty_down'] = []
+    dataInfo['MCEff'] = []
+    
+    for ih in listOfHistos:
+        
+        hist = inputFile.hist(ih)
+        hist_unc = inputFile.hist(ih+"_Systuncty")
+        hist_MCEff = inputFile.hist(ih.replace("sf","mc"))
+        print (ih.replace("sf","mc"))
+        
+        wp =ih.split('_')[-1:][0]
+        print(wp)
+        
+        #### all bins including the overflows (x runs slowest, as in the GetBinContent(ix,iy) loops before)
+        ptMin, etaMin = [a.ravel() for a in np.meshgrid(hist.lows[0], hist.lows[1], indexing="ij")]
+        ptMax, etaMax = [a.ravel() for a in np.meshgrid(hist.ups[0], hist.ups[1], indexing="ij")]
+        dataInfo['workingPoint'].extend([wp]*len(ptMin))
+        dataInfo['ptMin'].extend(ptMin)
+        dataInfo['ptMax'].extend(ptMax)
+        dataInfo['etaMin'].extend(etaMin)
+        dataInfo['etaMax'].extend(etaMax)
+        dataInfo['scaleFactor'].extend(np.where(ptMin >= 50, 1, hist.values.ravel()))
+        dataInfo['Object'].extend([ih]*len(ptMin))
+        dataInfo['scaleFactorSystUncty_up'].extend(hist_unc.values.ravel())
+        dataInfo['scaleFactorSystUncty_down'].extend(hist_unc.values.ravel())
+        dataInfo['MCEff'].extend(hist_MCEff.values.ravel())
+        
+        
+    df = pd.DataFrame( dataInfo )
+    df['ptMin'] = df['ptMin'].astype(float)
+    df['ptMax'] = df['ptMax'].astype(float)
+    df['etaMin'] = df['etaMin'].astype(float)
+    df['etaMax'] = df['etaMax'].astype(float)
+    return df
 
+
+def create_corr(year= "2016"):
     correction_dict = {}
     for imiseff in range(1):
         miseff = "eff"
 #        if imiseff==1: miseff = "mis"
         
-        listOfHistos = []
-        if bprintouts: print("List of Workingpoints that are considered")
-        for i in inputFile.GetListOfKeys(): 
-            if "sf" not in i.GetName(): continue
-            if "uncty" in i.GetName(): continue
-            if year not in i.GetName(): continue
-            if miseff not in i.GetName(): continue
-            listOfHistos.append(i.GetName())
-            if bprintouts: print(i)
-   
-        dataInfo = OrderedDict()
-        dataInfo['Object'] = []
-        dataInfo['workingPoint'] = []
-        dataInfo['ptMin'] = []
-        dataInfo['ptMax'] = []
-        dataInfo['etaMin'] = []
-        dataInfo['etaMax'] = []
-        dataInfo['scaleFactor'] = []
-        dataInfo['scaleFactorSystUncty_up'] = []
-        dataInfo['scaleFactorSystUncty_down'] = []
-        dataInfo['MCEff'] = []
-        
-        tmpHistos ={}
-        tmpHistos_up ={}
-        tmpHistos_down ={}
-        tmpHistos_MCEff ={}
-        for ih in listOfHistos:
-            
-            tmpHistos[ih] = inputFile.Get(ih)
-            tmpHistos_up[ih] = inputFile.Get(ih+"_Systuncty")
-            tmpHistos_down[ih] = inputFile.Get(ih+"_Systuncty")
-            tmpHistos_MCEff[ih] = inputFile.Get(ih.replace("sf","mc"))
-            print (ih.replace("sf","mc"))
-            
-            wp =ih.split('_')[-1:][0]
-            print(wp)
-            
-    
-            for ix in range( tmpHistos[ih].GetNbinsX()+2 ):      #### plus 2 for overflows
-                for iy in range(tmpHistos[ih].GetNbinsY()+2):
-                    dataInfo['workingPoint'].append(wp)
-                    dataInfo['ptMin'].append(tmpHistos[ih].GetXaxis().GetBinLowEdge(ix) )
-                    dataInfo['ptMax'].append(tmpHistos[ih].GetXaxis().GetBinUpEdge(ix) )
-                    dataInfo['etaMin'].append(tmpHistos[ih].GetYaxis().GetBinLowEdge(iy) )
-                    dataInfo['etaMax'].append(tmpHistos[ih].GetYaxis().GetBinUpEdge(iy) )
-    
-                    if tmpHistos[ih].GetXaxis().GetBinLowEdge(ix) >= 50:
-                        dataInfo['scaleFactor'].append(1 )
-                    else:
-                        dataInfo['scaleFactor'].append(tmpHistos[ih].GetBinContent(ix,iy) )
-                    dataInfo['Object'].append(ih )
-                    dataInfo['scaleFactorSystUncty_up'].append(tmpHistos_up[ih].GetBinContent(ix,iy) )
-                    dataInfo['scaleFactorSystUncty_down'].append(tmpHistos_down[ih].GetBinContent(ix,iy) )
-                    dataInfo['MCEff'].append(tmpHistos_MCEff[ih].GetBinContent(ix,iy) )
-            
-            
-        df = pd.DataFrame( dataInfo )
-        df['ptMin'] = df['ptMin'].astype(float)
-        df['ptMax'] = df['ptMax'].astype(float)
-        df['etaMin'] = df['etaMin'].astype(float)
-        df['etaMax'] = df['etaMax'].astype(float)
+        df = sfcache.cached_table("PUJetID_"+year+"_"+miseff, [infile], lambda: extract_table(year, miseff))
     
                 
             
@@ -114,38 +121,31 @@ def create_corr(year= "2016"):
         "corrections": [
             correction_dict[key] for key in correction_dict    ]
     })
-    cset.json()
-    with open(year+'_PUJetID.json', "w") as fout:
-        fout.write(cset.json(exclude_unset=True, indent=4))
+    outfile = year+'_PUJetID.json'
+    cset = hf.add_int_categories(cset)
+    nbytes = hf.write_cset(cset, outfile)
+    print("written "+outfile+" ("+str(nbytes)+" bytes)")
+    return cset
  
 
 
-create_corr("UL2016_")
-create_corr("UL2016APV")
-create_corr("UL2017")
-create_corr("UL2018")
-
-
-from correctionlib import _core
-
-#Download the correct JSON files 
-evaluator = _core.CorrectionSet.from_file('UL2016__PUJetID.json')
-
-valsf= evaluator["PUJetID_eff"].evaluate(-4.5,20.,"nom","L")
-print("sf is:"+str(valsf))
-
-valsf= evaluator["PUJetID_eff"].evaluate(-4.5,20.,"up","L")
-print("sf up is:"+str(valsf))
+if __name__ == "__main__":
+    create_corr("UL2016_")
+    create_corr("UL2016APV")
+    create_corr("UL2017")
+    create_corr("UL2018")
 
-valsf= evaluator["PUJetID_eff"].evaluate(-4.5,20.,"down","L")
-print("sf down is:"+str(valsf))
 
-valsf= evaluator["PUJetID_eff"].evaluate(-4.5,20.,"MCEff","L")
-print("MCEff is:"+str(valsf))
+    import sfeval
 
+    #### all systematics (nom, up, down, MCEff) of a batch of jets in one call
+    evaluator = sfeval.FusedCorrection.from_file('UL2016__PUJetID.json', "PUJetID_eff")
 
-valsf= evaluator["PUJetID_eff"].evaluate(-4.5,50.,"nom","L")
-print("sf is:"+str(valsf))
+    valsf = evaluator.evaluate(np.array([-4.5, -4.5, -4.5]), np.array([20., 50., 53.]), "L", structured=True)
+    print("sf is:"+str(valsf["nom"][0]))
+    print("sf up is:"+str(valsf["up"][0]))
+    print("sf down is:"+str(valsf["down"][0]))
+    print("MCEff is:"+str(valsf["MCEff"][0]))
 
-valsf= evaluator["PUJetID_eff"].evaluate(-4.5,53.,"nom","L")
-print("sf is:"+str(valsf))
+    print("sf is:"+str(valsf["nom"][1]))
+    print("sf is:"+str(valsf["nom"][2]))
@@ -9,7 +9,20 @@ import gzip
 
 bprintouts=False
 
-formular_nom = "(2.5626*x^3 - 3.2240*x^2 + 1.8687*x + 0.6770)"
+
+#### build targets: arguments of create_corr, the files they write and the input files they read (used by jsonformat.py in the top directory)
+targets = [
+    {"args": ["2016"], "outputs": ["2016_QuarkGluon.json"]},
+    {"args": ["2017"], "outputs": ["2017_QuarkGluon.json"]},
+    {"args": ["2018"], "outputs": ["2018_QuarkGluon.json"]},
+]
+
+#### the formulas are written with parameters, the distinct ones are stored once in the generic_formulas of the correction
+# nominal: polynomial in the discriminant
+formular_nom = "([0]*x^3 - [1]*x^2 + [2]*x + [3])"
+parameters_nom = [2.5626, 3.2240, 1.8687, 0.6770]
+# up/down: nominal*(1 + [4]*|nominal - 1|), [4] is +-2 below 30 GeV and +-1 above
+formular_syst = formular_nom+"*(1+[4]*abs("+formular_nom+" - 1))"
 
 
 def create_corr(year_="2016"):
@@ -21,9 +34,11 @@ def create_corr(year_="2016"):
     dataInfo['discrMin'] = ["0." for el in dataInfo['ptMax']]
     dataInfo['discrMax'] = ["1.0" for el in dataInfo['ptMax']] 
     dataInfo['formula'] = [formular_nom,formular_nom]
-    diff = "abs("+formular_nom+" - 1)"
-    dataInfo['formula_up'] = [formular_nom+"*(1+2*("+diff+"))",formular_nom +"*(1+"+diff+")"]
-    dataInfo['formula_down'] = [formular_nom+"*(1-2*("+diff+"))",formular_nom +"*(1-"+diff+")"]
+    dataInfo['formula_parameters'] = [parameters_nom,parameters_nom]
+    dataInfo['formula_up'] = [formular_syst,formular_syst]
+    dataInfo['formula_up_parameters'] = [parameters_nom+[2.],parameters_nom+[1.]]
+    dataInfo['formula_down'] = [formular_syst,formular_syst]
+    dataInfo['formula_down_parameters'] = [parameters_nom+[-2.],parameters_nom+[-1.]]
     
     
     df = pd.DataFrame( dataInfo )
@@ -32,6 +47,7 @@ def create_corr(year_="2016"):
     df['etaMin'] = df['etaMin'].astype(float)
     df['etaMax'] = df['etaMax'].astype(float)
     
+    generic_formulas = []
     corr_qg_part = Correction.parse_obj(
         {
             "version": 1,
@@ -44,7 +60,8 @@ def create_corr(year_="2016"):
                 {"name": "discriminant", "type": "real", "description": "The discriminated value"}
             ],
             "output": {"name": "weight", "type": "real"},
-            "data": hf.build_systs_formular(df),
+            "data": hf.build_systs_formular(df, generic_formulas=generic_formulas),
+            "generic_formulas": generic_formulas,
     }
         )
     
@@ -57,27 +74,29 @@ def create_corr(year_="2016"):
         "corrections": [
         corr_qg_part    ]
     })
-    cset.json()
-    with open(year_+'_QuarkGluon.json', "w") as fout:
-        fout.write(cset.json(exclude_unset=True, indent=4))
+    outfile = year_+'_QuarkGluon.json'
+    cset = hf.add_int_categories(cset)
+    nbytes = hf.write_cset(cset, outfile)
+    print("written "+outfile+" ("+str(nbytes)+" bytes)")
+    return cset
         
     
         
-create_corr("2016")
-create_corr("2017")
-create_corr("2018")
-
-from correctionlib import _core
+if __name__ == "__main__":
+    create_corr("2016")
+    create_corr("2017")
+    create_corr("2018")
 
-#Download the correct JSON files 
-evaluator = _core.CorrectionSet.from_file('2016_QuarkGluon.json')
+    from correctionlib import _core
 
-valsf= evaluator["Gluon_Pythia"].evaluate(1.0,20.,"nom",0.5)
-print("sf is:"+str(valsf))
+    #Download the correct JSON files 
+    evaluator = _core.CorrectionSet.from_file('2016_QuarkGluon.json')
 
-valsf= evaluator["Gluon_Pythia"].evaluate(1.0,20.,"up",0.5)
-print("sf up is:"+str(valsf))
+    valsf= evaluator["Gluon_Pythia"].evaluate(1.0,20.,"nom",0.5)
+    print("sf is:"+str(valsf))
 
-valsf= evaluator["Gluon_Pythia"].evaluate(1.0,20.,"down",0.5)
-print("sf down is:"+str(valsf))
+    valsf= evaluator["Gluon_Pythia"].evaluate(1.0,20.,"up",0.5)
+    print("sf up is:"+str(valsf))
 
+    valsf= evaluator["Gluon_Pythia"].evaluate(1.0,20.,"down",0.5)
+    print("sf down is:"+str(valsf))
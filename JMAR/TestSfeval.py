@@ -0,0 +1,127 @@
+import gzip, json, sys
+import numpy as np
+import correctionlib
+import sfeval
+
+#### compares sfeval with correctionlib evaluated jet by jet, for every correction with a systematic of the bundles
+#   python TestSfeval.py [BUNDLE ...]          (default: 2016_jmar.json 2018_jmar.json)
+# FusedCorrection.evaluate and evaluate_jagged/evaluate_awkward (with offsets that do not start at zero, with a
+# FusedCorrection and with the plain correctionlib correction) have to give the same values as the scalar evaluate.
+# The vectorized evaluate of correctionlib 2.3 returns the value of the first jet for all jets and is not used.
+
+rng = np.random.default_rng(42)
+njets = 300
+
+
+#### range of every binned input and keys of every category input of a tree
+def input_ranges(node, ranges, keys):
+    if isinstance(node, dict):
+        if node.get("nodetype") == "binning":
+            edges = sfeval.binning_edges(node)
+            low, high = ranges.get(node["input"], (edges[0], edges[-1]))
+            ranges[node["input"]] = (min(low, edges[0]), max(high, edges[-1]))
+        elif node.get("nodetype") == "multibinning":
+            for i, input in enumerate(node["inputs"]):
+                edges = sfeval.binning_edges({"edges": node["edges"][i]})
+                low, high = ranges.get(input, (edges[0], edges[-1]))
+                ranges[input] = (min(low, edges[0]), max(high, edges[-1]))
+        elif node.get("nodetype") == "category":
+            keys.setdefault(node["input"], [])
+            keys[node["input"]] += [item["key"] for item in node["content"] if item["key"] not in keys[node["input"]]]
+        for value in node.values():
+            input_ranges(value, ranges, keys)
+    elif isinstance(node, list):
+        for value in node:
+            input_ranges(value, ranges, keys)
+
+
+#### random jets (also outside of the binnings) for which correctionlib evaluates every systematic
+def random_jets(correction, fused, evaluator):
+    ranges, keys = {}, {}
+    input_ranges(correction["data"], ranges, keys)
+    columns = []
+    for name, type in zip(fused.inputs, fused.input_types):
+        if type == "real":
+            low, high = ranges.get(name, (0.0, 1.0))
+            margin = 0.1 * (high - low)
+            columns.append(rng.uniform(low - margin, high + margin, njets))
+        else:
+            columns.append(np.array(keys[name])[rng.integers(0, len(keys[name]), njets)])
+    expected, keep = [], []
+    for jet in zip(*[column.tolist() for column in columns]):
+        try:
+            expected.append([evaluator.evaluate(*fused.arguments(jet, syst)) for syst in fused.systematics])
+            keep.append(True)
+        except Exception:
+            keep.append(False)
+    return [column[np.array(keep)] for column in columns], np.array(expected).reshape(-1, len(fused.systematics))
+
+
+def compare(label, values, expected):
+    values = np.asarray(values, dtype=float)
+    if values.shape != expected.shape or not np.allclose(values, expected, rtol=1e-12, atol=0.0):
+        difference = np.max(np.abs(values - expected)) if values.shape == expected.shape else "shape " + str(values.shape)
+        print("DIFFERENT " + label + ": max difference " + str(difference))
+        return False
+    return True
+
+
+def check_jagged(name, fused, evaluator, columns, expected):
+    ok = True
+    n = len(expected)
+    # events with 0 to 4 jets, the first events are skipped so that the offsets do not start at zero
+    counts = rng.integers(0, 5, n)
+    offsets = sfeval.offsets_from_counts(counts)
+    offsets = offsets[: np.searchsorted(offsets, n, side="right")]
+    offsets = offsets[3:] if len(offsets) > 4 else offsets
+    start, stop = offsets[0], offsets[-1]
+    jagged = sfeval.evaluate_jagged(fused, offsets, *columns)
+    ok &= compare(name + " evaluate_jagged (fused)", jagged.content, expected[start:stop])
+    ok &= all(np.array_equal(jagged[i], jagged.content[offsets[i] - start : offsets[i + 1] - start]) for i in range(len(jagged)))
+    syst = fused.systematics[0]
+    plain = sfeval.evaluate_jagged(evaluator, offsets, *fused.arguments(columns, syst))
+    ok &= compare(name + " evaluate_jagged (correctionlib)", plain.content, expected[start:stop, 0])
+    try:
+        import awkward as ak
+    except ImportError:
+        return ok
+    events = [ak.unflatten(column[start:stop], np.diff(offsets)) for column in columns]
+    result = sfeval.evaluate_awkward(fused, *events)
+    ok &= compare(name + " evaluate_awkward (fused)", ak.to_numpy(ak.flatten(result, axis=1)), expected[start:stop])
+    result = sfeval.evaluate_awkward(evaluator, *fused.arguments(events, syst))
+    ok &= compare(name + " evaluate_awkward (correctionlib)", ak.to_numpy(ak.flatten(result)), expected[start:stop, 0])
+    return ok
+
+
+def check_bundle(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        corrections = json.load(f)["corrections"]
+    cset = correctionlib.CorrectionSet.from_file(path)
+    ok = True
+    for correction in corrections:
+        if "systematic" not in [variable["name"] for variable in correction["inputs"]]:
+            continue
+        name = correction["name"]
+        fused = sfeval.FusedCorrection(correction)
+        evaluator = cset[name]
+        columns, expected = random_jets(correction, fused, evaluator)
+        if not len(expected):
+            print("no jets inside of " + name)
+            continue
+        good = compare(name, fused.evaluate(*columns), expected)
+        good &= check_jagged(name, fused, evaluator, columns, expected)
+        print("{:8s} {:40s} {:4d} jets  {}".format(
+            "ok" if good else "FAILED", name, len(expected), "table" if fused.table is not None else "correctionlib"
+        ))
+        ok &= good
+    return ok
+
+
+if __name__ == "__main__":
+    ok = True
+    for path in sys.argv[1:] or ["2016_jmar.json", "2018_jmar.json"]:
+        print(path)
+        ok &= check_bundle(path)
+    print("sfeval agrees with correctionlib" if ok else "sfeval DOES NOT AGREE with correctionlib")
+    sys.exit(0 if ok else 1)
@@ -3,13 +3,21 @@ import numpy as np
 from collections import OrderedDict
 from correctionlib.schemav2 import Correction, Binning, Category, Formula, CorrectionSet
 import os, sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 import helperfunctionsv2 as hf
+import histreader as hr
 import gzip
-import ROOT
 
 bprintouts=False
 
+
+#### build targets: arguments of create_corr, the files they write and the input files they read (used by jsonformat.py in the top directory)
+targets = [
+    {"args": ["2016"], "outputs": ["2016_Toptagging.json"], "inputs": ["2016TopTaggingScaleFactors.root", "2016TopTaggingScaleFactors_NoMassCut.root"]},
+    {"args": ["2017"], "outputs": ["2017_Toptagging.json"], "inputs": ["2017TopTaggingScaleFactors.root", "2017TopTaggingScaleFactors_NoMassCut.root"]},
+    {"args": ["2018"], "outputs": ["2018_Toptagging.json"], "inputs": ["2018TopTaggingScaleFactors.root", "2018TopTaggingScaleFactors_NoMassCut.root"]},
+]
+
 # this script depends on the 'infile' name. The root file should be inside this folder and is calles 'YEAR_TopTaggingScaleFactors.root'
 # it runs over three modes 'mergedTop', 'semimerged', 'notmerged'
 
@@ -24,14 +32,14 @@ def create_corr(year_="2016"):
         infile = year_+'TopTaggingScaleFactors'+postfix+'.root'
         
         print("working on " + infile)
-        inputFile = ROOT.TFile.Open(infile)
+        inputFile = hr.open_file(infile)
         
         modes = ['mergedTop', 'semimerged', 'notmerged']
     
         listOfHistos = []
         if bprintouts: print("List of Workingpoints that are considered")
-        for i in inputFile.GetListOfKeys(): 
-            listOfHistos.append(i.GetName())
+        for i in inputFile.keys(): 
+            listOfHistos.append(i)
             if bprintouts: print(i)
         
         
@@ -52,9 +60,9 @@ def create_corr(year_="2016"):
             for ih in listOfHistos:
 
                 histname = "sf_"+mode+"_nominal"
-                tmpHistos[ih] = inputFile.Get(ih+"/"+histname)
-                tmpHistos_up[ih] = inputFile.Get(ih+"/"+histname.replace("nominal","up"))
-                tmpHistos_down[ih] = inputFile.Get(ih+"/"+histname.replace("nominal","down"))
+                tmpHistos[ih] = inputFile.hist(ih+"/"+histname)
+                tmpHistos_up[ih] = inputFile.hist(ih+"/"+histname.replace("nominal","up"))
+                tmpHistos_down[ih] = inputFile.hist(ih+"/"+histname.replace("nominal","down"))
         
                 wp=""
                 if "HOTVR" in ih: wp = "HOTVR"
@@ -62,15 +70,15 @@ def create_corr(year_="2016"):
                     wp =[ x for x in ih.split('_') if x.startswith("wp")]
                     wp = wp[0] if len(wp) else "wp1"
                 if "btag" in ih: wp+="_btag"
-                for ix in range( tmpHistos[ih].GetNbinsX()+2 ):      #### plus 2 for overflows
-                    dataInfo['workingPoint'].append(wp)
-                    dataInfo['ptMin'].append(tmpHistos[ih].GetXaxis().GetBinLowEdge(ix) )
-                    dataInfo['ptMax'].append(tmpHistos[ih].GetXaxis().GetBinUpEdge(ix) )
-                    dataInfo['scaleFactor'].append(tmpHistos[ih].GetBinContent(ix) )
-                    dataInfo['Object'].append(ih )
-                    dataInfo['scaleFactorSystUncty_up'].append(tmpHistos_up[ih].GetBinContent(ix) )
-                    dataInfo['scaleFactorSystUncty_down'].append(tmpHistos_down[ih].GetBinContent(ix) )
-        
+                #### all bins including the overflows
+                nbins = len(tmpHistos[ih].values)
+                dataInfo['workingPoint'].extend([wp]*nbins)
+                dataInfo['ptMin'].extend(tmpHistos[ih].lows[0] )
+                dataInfo['ptMax'].extend(tmpHistos[ih].ups[0] )
+                dataInfo['scaleFactor'].extend(tmpHistos[ih].values )
+                dataInfo['Object'].extend([ih]*nbins )
+                dataInfo['scaleFactorSystUncty_up'].extend(tmpHistos_up[ih].values )
+                dataInfo['scaleFactorSystUncty_down'].extend(tmpHistos_down[ih].values )
         
             dataInfo['year'] = [ year_ for el in dataInfo["scaleFactor"]]
             if "16" in year_:
@@ -117,25 +125,28 @@ def create_corr(year_="2016"):
         "corrections": [
             correction_dict[key] for key in correction_dict    ]
     })
-    cset.json()
-    with open(year_+'_Toptagging.json', "w") as fout:
-        fout.write(cset.json(exclude_unset=True, indent=4))
+    outfile = year_+'_Toptagging.json'
+    cset = hf.add_int_categories(cset)
+    nbytes = hf.write_cset(cset, outfile)
+    print("written "+outfile+" ("+str(nbytes)+" bytes)")
+    return cset
 
 
-create_corr("2016")
-create_corr("2017")
-create_corr("2018")
+if __name__ == "__main__":
+    create_corr("2016")
+    create_corr("2017")
+    create_corr("2018")
 
-from correctionlib import _core
+    from correctionlib import _core
 
-#Download the correct JSON files 
-evaluator = _core.CorrectionSet.from_file('2016_Toptagging.json')
+    #Download the correct JSON files 
+    evaluator = _core.CorrectionSet.from_file('2016_Toptagging.json')
 
-valsf= evaluator["Top_tagging_PUPPI_mergedTop"].evaluate(2.0,450.,"nom","wp1")
-print("sf is:"+str(valsf))
+    valsf= evaluator["Top_tagging_PUPPI_mergedTop"].evaluate(2.0,450.,"nom","wp1")
+    print("sf is:"+str(valsf))
 
-valsf= evaluator["Top_tagging_PUPPI_mergedTop"].evaluate(2.0,450.,"up","wp1")
-print("sf up is:"+str(valsf))
+    valsf= evaluator["Top_tagging_PUPPI_mergedTop"].evaluate(2.0,450.,"up","wp1")
+    print("sf up is:"+str(valsf))
 
-valsf= evaluator["Top_tagging_PUPPI_mergedTop"].evaluate(2.0,450.,"down","wp1")
-print("sf down is:"+str(valsf))
+    valsf= evaluator["Top_tagging_PUPPI_mergedTop"].evaluate(2.0,450.,"down","wp1")
+    print("sf down is:"+str(valsf))
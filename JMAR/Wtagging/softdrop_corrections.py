@@ -5,12 +5,19 @@ from correctionlib.schemav2 import Correction, Binning, Category, Formula, Corre
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import helperfunctionsv2 as hf
+import histreader as hr
 import gzip
-import ROOT
-import ctypes
 
 bprintouts=False
 
+
+#### build targets: arguments of create_corr, the files they write and the input files they read (used by jsonformat.py in the top directory)
+targets = [
+    {"args": ["2016"], "outputs": ["2016_softdrop.json"], "inputs": ["puppiCorr.root"]},
+    {"args": ["2017"], "outputs": ["2017_softdrop.json"], "inputs": ["puppiCorr.root"]},
+    {"args": ["2018"], "outputs": ["2018_softdrop.json"], "inputs": ["puppiCorr.root"]},
+]
+
 ###
 #
 # This script, does not yet provid an uncertainty. The syst 'up'/'down' will just be the nominal value
@@ -20,27 +27,19 @@ bprintouts=False
 def create_corr(year):
     infile = "puppiCorr.root"
     
-    inputFile = ROOT.TFile.Open(infile)
+    inputFile = hr.open_file(infile)
     
 
     histname_central = "puppiJECcorr_reco_0eta1v3"
     histname_forward = "puppiJECcorr_reco_1v3eta2v5"
     histname_gen = "puppiJECcorr_gen"
 
-    hist_central = inputFile.Get(histname_central)
-    hist_forward = inputFile.Get(histname_forward)
-    hist_gen = inputFile.Get(histname_gen)
-
-    result_string_central = hist_central.GetTitle()
-    result_string_forward = hist_forward.GetTitle()
-    result_string_gen = hist_gen.GetTitle()
+    hist_central = inputFile.function(histname_central)
+    hist_forward = inputFile.function(histname_forward)
+    hist_gen = inputFile.function(histname_gen)
 
-    for ipar in range(0,hist_central.GetNpar()): result_string_central = result_string_central.replace("["+str(ipar)+"]",str(hist_central.GetParameter(ipar)))
-    for ipar in range(0,hist_forward.GetNpar()): result_string_forward = result_string_forward.replace("["+str(ipar)+"]",str(hist_forward.GetParameter(ipar)))
-    for ipar in range(0,hist_gen.GetNpar()): result_string_gen = result_string_gen.replace("["+str(ipar)+"]",str(hist_gen.GetParameter(ipar)))
-
-    result_central = ROOT.TF1("central","("+result_string_central+")*("+result_string_gen+")")
-    result_forward = ROOT.TF1("forward","("+result_string_forward+")*("+result_string_gen+")")
+    #### the fit functions are written with their parameters ([0], [1], ...), central and forward share one generic formula
+    #### the gen correction (hist_gen) is not part of the json yet
     
     dataInfo = OrderedDict()
     if "2016" in year:
@@ -50,12 +49,12 @@ def create_corr(year):
         dataInfo['etaMin'] = ['-2.5','-1.3','1.3']
         dataInfo['etaMax'] = ['-1.3','1.3','2.5']
 
-    xmax, xmin = ctypes.c_double(0),ctypes.c_double(0)
-    hist_central.GetRange(xmin,xmax)
-    dataInfo['ptMin'] = [xmin.value for el in dataInfo['etaMin']]
-    dataInfo['ptMax'] = [xmax.value for el in dataInfo['etaMin']]
+    #### the pt range of the fit (TF1 range), also the range of the tables with JMAR_TABULATE (see helperfunctionsv2.py)
+    dataInfo['ptMin'] = [hist_central.xmin for el in dataInfo['etaMin']]
+    dataInfo['ptMax'] = [hist_central.xmax for el in dataInfo['etaMin']]
 
-    dataInfo['formula'] = [result_string_forward, result_string_central, result_string_forward]
+    dataInfo['formula'] = [hist_forward.title, hist_central.title, hist_forward.title]
+    dataInfo['formula_parameters'] = [list(hist_forward.params), list(hist_central.params), list(hist_forward.params)]
 
 
     df = pd.DataFrame( dataInfo )
@@ -64,6 +63,7 @@ def create_corr(year):
     df['etaMin'] = df['etaMin'].astype(float)
     df['etaMax'] = df['etaMax'].astype(float)
     
+    generic_formulas = []
     corr_softdrop_part = Correction.parse_obj(
         {
             "version": 1,
@@ -76,7 +76,8 @@ def create_corr(year):
                
             ],
             "output": {"name": "weight", "type": "real"},
-            "data": hf.build_systs_formular(df,False),
+            "data": hf.build_systs_formular(df,False, generic_formulas=generic_formulas),
+            "generic_formulas": generic_formulas,
     }
         )
     
@@ -88,27 +89,29 @@ def create_corr(year):
         "corrections": [
         corr_softdrop_part    ]
     })
-    cset.json()
-    with open(year+'_softdrop.json', "w") as fout:
-        fout.write(cset.json(exclude_unset=True, indent=4))
+    outfile = year+'_softdrop.json'
+    cset = hf.add_int_categories(cset)
+    nbytes = hf.write_cset(cset, outfile)
+    print("written "+outfile+" ("+str(nbytes)+" bytes)")
+    return cset
         
     
         
-create_corr("2016")
-create_corr("2017")
-create_corr("2018")
-
-from correctionlib import _core
+if __name__ == "__main__":
+    create_corr("2016")
+    create_corr("2017")
+    create_corr("2018")
 
-#Download the correct JSON files 
-evaluator = _core.CorrectionSet.from_file('2016_softdrop.json')
+    from correctionlib import _core
 
-valsf= evaluator["JMS"].evaluate(1.0,200.,"nom")
-print("sf is:"+str(valsf))
+    #Download the correct JSON files 
+    evaluator = _core.CorrectionSet.from_file('2016_softdrop.json')
 
-valsf= evaluator["JMS"].evaluate(1.0,200.,"up")
-print("sf up is:"+str(valsf))
+    valsf= evaluator["JMS"].evaluate(1.0,200.,"nom")
+    print("sf is:"+str(valsf))
 
-valsf= evaluator["JMS"].evaluate(1.0,200.,"down")
-print("sf down is:"+str(valsf))
+    valsf= evaluator["JMS"].evaluate(1.0,200.,"up")
+    print("sf up is:"+str(valsf))
 
+    valsf= evaluator["JMS"].evaluate(1.0,200.,"down")
+    print("sf down is:"+str(valsf))
@@ -5,39 +5,53 @@ from correctionlib.schemav2 import Correction, Binning, Category, Formula, Corre
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import helperfunctionsv2 as hf
+import sfcache
 import gzip
 import re
 
 bprintouts=False
 
+
+#### build targets: arguments of create_corr, the files they write and the input files they read (used by jsonformat.py in the top directory)
+targets = [
+    {"args": ["2016"], "outputs": ["2016_Wtagging.json"]},
+    {"args": ["2017"], "outputs": ["2017_Wtagging.json"]},
+    {"args": ["2018"], "outputs": ["2018_Wtagging.json"]},
+]
+
 #######
 #
 # This script is only for EOY SF. For UL the json format will be produced as an output of the fitting code
 #
 ######
-import Run2SF 
 
+#### reads the SF table from Run2SF.py (cached in .sfcache, see sfcache.py)
+def extract_table():
+    import Run2SF 
 
-dataInfo = OrderedDict()
-dataInfo['workingPoint'] = [key for key in sorted(Run2SF.SF)]
-dataInfo['year'] = [key[:4] for key in sorted(Run2SF.SF)]
-dataInfo['ptMin'] = ['200' for el in dataInfo['workingPoint']]
-dataInfo['ptMax'] = ['1000' for el in dataInfo['workingPoint']]
-dataInfo['etaMin'] = ["-2.4" for el in dataInfo['workingPoint']]
-dataInfo['etaMax'] = ["2.4" for el in dataInfo['workingPoint']]
-dataInfo['scaleFactor'] = [Run2SF.SF[key] for key in sorted(Run2SF.SF)]
-dataInfo['scaleFactorSystUncty_up'] =  [Run2SF.SFerrors[key] for key in sorted(Run2SF.SF)]
-dataInfo['scaleFactorSystUncty_down'] = [Run2SF.SFerrors[key] for key in sorted(Run2SF.SF)]
+    dataInfo = OrderedDict()
+    dataInfo['workingPoint'] = [key for key in sorted(Run2SF.SF)]
+    dataInfo['year'] = [key[:4] for key in sorted(Run2SF.SF)]
+    dataInfo['ptMin'] = ['200' for el in dataInfo['workingPoint']]
+    dataInfo['ptMax'] = ['1000' for el in dataInfo['workingPoint']]
+    dataInfo['etaMin'] = ["-2.4" for el in dataInfo['workingPoint']]
+    dataInfo['etaMax'] = ["2.4" for el in dataInfo['workingPoint']]
+    dataInfo['scaleFactor'] = [Run2SF.SF[key] for key in sorted(Run2SF.SF)]
+    dataInfo['scaleFactorSystUncty_up'] =  [Run2SF.SFerrors[key] for key in sorted(Run2SF.SF)]
+    dataInfo['scaleFactorSystUncty_down'] = [Run2SF.SFerrors[key] for key in sorted(Run2SF.SF)]
 
 
-df = pd.DataFrame( dataInfo )
-df['ptMin'] = df['ptMin'].astype(int)
-df['ptMax'] = df['ptMax'].astype(int)
-df['scaleFactor'] = df['scaleFactor'].astype(float)
-df['scaleFactorSystUncty_up'] = df['scaleFactorSystUncty_up'].astype(float)
-df['scaleFactorSystUncty_down'] = df['scaleFactorSystUncty_down'].astype(float)
+    df = pd.DataFrame( dataInfo )
+    df['ptMin'] = df['ptMin'].astype(int)
+    df['ptMax'] = df['ptMax'].astype(int)
+    df['scaleFactor'] = df['scaleFactor'].astype(float)
+    df['scaleFactorSystUncty_up'] = df['scaleFactorSystUncty_up'].astype(float)
+    df['scaleFactorSystUncty_down'] = df['scaleFactorSystUncty_down'].astype(float)
+    return df
+
 
 def create_corr(year = "2016"):
+    df = sfcache.cached_table("Wtagging", ["Run2SF.py"], extract_table)
 
     correction_dict = {}
 
@@ -90,28 +104,30 @@ def create_corr(year = "2016"):
         "corrections": [
             correction_dict[key] for key in correction_dict    ]
     })
-    cset.json()
-    with open(year+'_Wtagging.json', "w") as fout:
-        fout.write(cset.json(exclude_unset=True, indent=4))
+    outfile = year+'_Wtagging.json'
+    cset = hf.add_int_categories(cset)
+    nbytes = hf.write_cset(cset, outfile)
+    print("written "+outfile+" ("+str(nbytes)+" bytes)")
+    return cset
         
 
 
-create_corr("2016")
-create_corr("2017")
-create_corr("2018")
-
+if __name__ == "__main__":
+    create_corr("2016")
+    create_corr("2017")
+    create_corr("2018")
 
-from correctionlib import _core
 
-#Download the correct JSON files 
-evaluator = _core.CorrectionSet.from_file('2016_Wtagging.json')
+    from correctionlib import _core
 
-valsf= evaluator["Wtagging_2016HP43DDT"].evaluate(2.0,450.,"nom","2016HP43DDT")
-print("sf is:"+str(valsf))
+    #Download the correct JSON files 
+    evaluator = _core.CorrectionSet.from_file('2016_Wtagging.json')
 
-valsf= evaluator["Wtagging_2016HP43DDT"].evaluate(2.0,450.,"up","2016HP43DDT")
-print("sf up is:"+str(valsf))
+    valsf= evaluator["Wtagging_2016HP43DDT"].evaluate(2.0,450.,"nom","2016HP43DDT")
+    print("sf is:"+str(valsf))
 
-valsf= evaluator["Wtagging_2016HP43DDT"].evaluate(2.0,450.,"down","2016HP43DDT")
-print("sf down is:"+str(valsf))
+    valsf= evaluator["Wtagging_2016HP43DDT"].evaluate(2.0,450.,"up","2016HP43DDT")
+    print("sf up is:"+str(valsf))
 
+    valsf= evaluator["Wtagging_2016HP43DDT"].evaluate(2.0,450.,"down","2016HP43DDT")
+    print("sf down is:"+str(valsf))
@@ -2,8 +2,11 @@ import pandas as pd
 import numpy as np
 from collections import OrderedDict
 from correctionlib.schemav2 import Correction, Binning, Category, Formula
+from helpernodes import CategoryNode, BinningNode, to_schema
 
 #### Here the logic is to go backwards. First check the SF, then filter with the ptbinning, etc.. TAKEN from https://gist.github.com/alefisico/2e190a8380f54cfbcd7c6c7baa58ce56
+#### The trees are built from lightweight nodes (see helpernodes, the *_tree functions), the build functions convert and validate
+#### the finished tree once with to_schema and return schemav2 objects as before
 
 # def build_SF(sf):
 #     print(sf)
@@ -15,84 +18,67 @@ from correctionlib.schemav2 import Correction, Binning, Category, Formula
 #     return float(value)
 
 
-def build_SF(sf):
+def sf_tree(sf):
     print(sf)
     if len(sf) != 1:
         raise ValueError(sf)
 
     value = sf.iloc[0]["scaleFactor"]
     print(value)
-    return Category.parse_obj(
-        {
-            "nodetype": "category",
-            "input": "systematic",
-            "content": [
-                {"key": "nominal", "value": float(value)},
-                {"key": "up", "value": float(value)},
-                {"key": "down", "value": float(value)},
-            ],
-        }    )
+    return CategoryNode("systematic", ["nominal", "up", "down"], [float(value), float(value), float(value)])
 
 
-def build_ptbinning(sf):
+def pt_tree(sf):
     edges = sorted(set(sf['ptMin']) | set(sf['ptMax']))
     print(edges)
-    return Binning.parse_obj({
-        "nodetype": "binning",
-        "input": "pt",
-        "edges": edges,
-        "content": [
-            build_SF(sf[(sf['ptMin'] >= lo) & (sf['ptMax'] <= hi)])
+    return BinningNode("pt", edges, [
+            sf_tree(sf[(sf['ptMin'] >= lo) & (sf['ptMax'] <= hi)])
             for lo, hi in zip(edges[:-1], edges[1:])
-        ],
-        "flow": "clamp",
-    })
+        ], "clamp")
 
-def build_etabinning(sf):
+def eta_tree(sf):
     edges = sorted(set(sf['etaMin']) | set(sf['etaMax']))
-    return Binning.parse_obj({
-        "nodetype": "binning",
-        "input":"eta",
-        "edges": edges,
-        "content": [
-            build_ptbinning(sf[(sf['etaMin'] >= lo) & (sf['etaMax'] <= hi)])
+    return BinningNode("eta", edges, [
+            pt_tree(sf[(sf['etaMin'] >= lo) & (sf['etaMax'] <= hi)])
             for lo, hi in zip(edges[:-1], edges[1:])
-        ],
-        "flow": "error",
-    })
+        ], "error")
 
-def build_wptype(sf):
+def wptype_tree(sf):
     keys = sorted(sf['workingPoint'].unique())
-    return Category.parse_obj({
-        "nodetype": "category",
-        "input":"workingPoint",
-        "keys": keys,
-        "content": [
-            build_etabinning(sf[sf['workingPoint'] == key])
+    return CategoryNode("workingPoint", keys, [
+            eta_tree(sf[sf['workingPoint'] == key])
             for key in keys
-        ]
-    })
+        ])
 
-def build_valueType(sf):
+def valuetype_tree(sf):
     keys = list(sf['valueType'].unique())
-    return Category.parse_obj({
-        "nodetype": "category",
-        "input":"valueType",
-        "keys": keys,
-        "content": [
-            build_wptype(sf[sf['valueType'] == key])
+    return CategoryNode("valueType", keys, [
+            wptype_tree(sf[sf['valueType'] == key])
             for key in keys
-        ]
-    })
+        ])
 
-def build_year(sf):
+def year_tree(sf):
     keys = list(sf['year'].unique())
-    return Category.parse_obj({
-        "nodetype": "category",
-        "input": "year",
-        "keys": keys,
-        "content": [
-            build_valueType(sf[sf['year'] == key])
+    return CategoryNode("year", keys, [
+            valuetype_tree(sf[sf['year'] == key])
             for key in keys
-        ]
-    })
+        ])
+
+
+def build_SF(sf):
+    return to_schema(sf_tree(sf))
+
+def build_ptbinning(sf):
+    return to_schema(pt_tree(sf))
+
+def build_etabinning(sf):
+    return to_schema(eta_tree(sf))
+
+def build_wptype(sf):
+    return to_schema(wptype_tree(sf))
+
+def build_valueType(sf):
+    return to_schema(valuetype_tree(sf))
+
+def build_year(sf):
+    return to_schema(year_tree(sf))
@@ -1,222 +1,619 @@
 import pandas as pd
 import numpy as np
 from collections import OrderedDict
+import gzip, json, os
 from correctionlib.schemav2 import Correction, Binning, Category, Formula
+from helpernodes import CategoryNode, BinningNode, MultiBinningNode, FormulaNode, FormulaRefNode, to_schema, to_dict, from_dict
 
 
 
+# The scale factor table is converted once into numpy columns. Every node below only works on
+# the row indices of its bin, which are assigned with a single searchsorted per level instead of
+# re-filtering the whole DataFrame for each bin.
+def sf_columns(sf):
+    return {name: sf[name].to_numpy() for name in sf.columns}
+
+
+def split_bins(cols, rows, colMin, colMax):
+    lo = cols[colMin][rows].astype(float)
+    hi = cols[colMax][rows].astype(float)
+    edges = np.unique(np.concatenate((lo, hi)))
+    nbins = max(len(edges) - 1, 0)
+    ibin = np.searchsorted(edges, lo)
+    # a row only belongs to a bin if it spans exactly this bin (same as the former range filter)
+    inbin = np.searchsorted(edges, hi) == ibin + 1
+    ibin = ibin[inbin]
+    order = np.argsort(ibin, kind="stable")
+    counts = np.bincount(ibin, minlength=nbins)
+    bins = np.split(rows[inbin][order], np.cumsum(counts)[:-1]) if nbins else []
+    return edges.tolist(), bins
+
+
+def split_keys(cols, rows, col):
+    keys, inverse = np.unique(cols[col][rows], return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    counts = np.bincount(inverse, minlength=len(keys))
+    return keys.tolist(), np.split(rows[order], np.cumsum(counts)[:-1])
+
+
+def select_rows(cols, rows):
+    return pd.DataFrame({name: col[rows] for name, col in cols.items()})
+
+
+def single_row(cols, rows):
+    if len(rows) != 1:
+        raise ValueError(select_rows(cols, rows))
+    return rows[0]
+
+
+# All systematic variations share the same working point, eta, pt (and discriminant) bins. The table
+# is therefore traversed only once into a tree of nodes (see helpernodes) whose leaves are tuples holding
+# the value of every requested variation. 'emit' then picks the nodes of the i-th one, subtrees without
+# tuple leaves are shared between the variations. The trees are validated only once by 'to_schema'.
+def emit(node, i):
+    if isinstance(node, tuple):
+        return node[i]
+    if isinstance(node, (CategoryNode, BinningNode, MultiBinningNode)):
+        return node.with_content([emit(value, i) for value in node.content])
+    return node
+
+
+# A binning whose children are binnings with the same input, edges and flow (e.g. eta bins that all share the same
+# pt edges) is written as one multibinning with a flat content array. This avoids repeating the edges and needs
+# only one lookup per evaluation. Binnings whose children have different edges stay nested.
+def merge_grids(node):
+    if isinstance(node, CategoryNode):
+        return node.with_content([merge_grids(value) for value in node.content])
+    if not isinstance(node, BinningNode):
+        return node
+    children = node.content
+    first = children[0] if children else None
+    if isinstance(first, BinningNode) and all(
+        isinstance(child, BinningNode)
+        and child.input == first.input
+        and child.edges == first.edges
+        and child.flow == node.flow
+        for child in children
+    ):
+        content = [value for child in children for value in child.content]
+        return MultiBinningNode([node.input, first.input], [node.edges, first.edges], content, node.flow)
+    return node.with_content([merge_grids(value) for value in children])
+
+
+def build_syst_category(tree, systs, fold = False):
+    variations = [emit(tree, i) for i in range(len(systs))]
+    if fold:
+        variations = [fold_content(variation) for variation in variations]
+    return CategoryNode("systematic", systs, variations)
+
+
+#### Folding pass: shrinks a built tree without changing any evaluated value
+# - adjacent bins with the same content are merged into one bin
+# - a binning (or multibinning axis) left with one bin is replaced by its content if the flow is "clamp"
+#   (or the flow content is the same), with flow "error" the single bin is kept so that out of range values still fail
+# Categories are kept as they are since unknown keys have to raise an error.
+def fold_content(node):
+    if isinstance(node, CategoryNode):
+        return node.with_content([fold_content(value) for value in node.content])
+    if isinstance(node, BinningNode):
+        return fold_binning(node)
+    if isinstance(node, MultiBinningNode):
+        return fold_multibinning(node)
+    return node
+
+
+def collapsible(flow, value):
+    return flow == "clamp" or (not isinstance(flow, str) and flow == value)
+
+
+def fold_binning(node):
+    content = [fold_content(value) for value in node.content]
+    if not isinstance(node.edges, list):
+        return node.with_content(content)
+    edges = [node.edges[0]]
+    merged = []
+    for value, hi in zip(content, node.edges[1:]):
+        if merged and value == merged[-1]:
+            edges[-1] = hi
+        else:
+            merged.append(value)
+            edges.append(hi)
+    if len(merged) == 1 and collapsible(node.flow, merged[0]):
+        return merged[0]
+    return BinningNode(node.input, edges, merged, node.flow)
+
+
+def fold_multibinning(node):
+    if not all(isinstance(edges, list) for edges in node.edges):
+        return node.with_content([fold_content(value) for value in node.content])
+    grid = np.empty(len(node.content), dtype=object)
+    for i, value in enumerate(node.content):
+        grid[i] = fold_content(value)
+    grid = grid.reshape([len(edges) - 1 for edges in node.edges])
+
+    inputs, alledges = [], []
+    for axis, (inp, edges) in enumerate(zip(node.inputs, node.edges)):
+        keep = [0]
+        for i in range(1, len(edges) - 1):
+            last = np.take(grid, keep[-1], axis=axis).flat
+            if not all(a == b for a, b in zip(last, np.take(grid, i, axis=axis).flat)):
+                keep.append(i)
+        grid = np.take(grid, keep, axis=axis)
+        inputs.append(inp)
+        alledges.append([edges[i] for i in keep] + [edges[-1]])
+
+    # axes with a single bin can be dropped if the flow allows it
+    for axis in reversed(range(len(inputs))):
+        if grid.shape[axis] == 1 and collapsible(node.flow, grid.flat[0] if grid.size == 1 else None):
+            grid = np.take(grid, [0], axis=axis).reshape(grid.shape[:axis] + grid.shape[axis + 1:])
+            del inputs[axis], alledges[axis]
+    if not inputs:
+        return grid.item()
+    if len(inputs) == 1:
+        return BinningNode(inputs[0], alledges[0], list(grid.flat), node.flow)
+    return MultiBinningNode(inputs, alledges, list(grid.flat), node.flow)
+
+
+# applies the folding pass to an already built schemav2 Correction (or its dict)
+def fold_correction(corr):
+    corr = corr if isinstance(corr, dict) else corr.dict(exclude_unset=True)
+    return Correction.parse_obj(dict(corr, data=to_dict(fold_content(from_dict(corr["data"])))))
+
+
 # 'unc' regulates if the scaleFactorSystUncty_up is an uncertainty or already the sf_up
 # True: it is the uncertainty and in 'build_sf' we therefore need to add it to the sf
 # False: it is already the SF_up so we do not need to add anything
-def build_systs(sf,unc = True):
-    return Category.parse_obj(
-        {
-            "nodetype": "category",
-            "input": "systematic",
-            "content": [
-                {"key": "nom", "value": build_wp(sf)},
-                {"key": "up", "value": build_wp(sf,syst="up",unc=unc)},
-                {"key": "down", "value": build_wp(sf,syst="down",unc=unc)},
-                {"key": "MCEff", "value": build_wp(sf,syst="MCEff",unc=unc)}
-            ],
-        }
-    )
+# "MCEff" is only added if the table provides the MC efficiency (e.g. PUJetID)
+# 'multibinning' writes rectangular eta x pt grids as a single multibinning (see merge_grids)
+# 'fold' merges equal adjacent bins and constant subtrees of each variation (see fold_content)
+def build_systs(sf,unc = True, multibinning = True, fold = True):
+    systs = ["nom", "up", "down"]
+    if "MCEff" in sf:
+        systs.append("MCEff")
+    tree = wp_tree(sf_columns(sf), np.arange(len(sf)), systs, unc)
+    if multibinning:
+        tree = merge_grids(tree)
+    return to_schema(build_syst_category(tree, systs, fold))
 
 
 def build_wp(sf,syst = "nom",unc=True):
-    keys = sorted(sf["workingPoint"].unique())
-    return Category.parse_obj(
-        {
-            "nodetype": "category",
-            "input": "workingpoint",
-            "content": [
-                {"key": key, "value": build_etabinning(sf[sf["workingPoint"] == key],syst,unc)}
-                for key in keys
-            ],
-        }
-    )
+    return to_schema(emit(wp_tree(sf_columns(sf), np.arange(len(sf)), [syst], unc), 0))
+
+
+def wp_tree(cols, rows, systs, unc):
+    keys, bins = split_keys(cols, rows, "workingPoint")
+    return CategoryNode("workingpoint", keys, [eta_tree(cols, inbin, systs, unc) for inbin in bins])
 
 
 def build_etabinning(sf,syst,unc):
-    edges = sorted(set(sf["etaMin"]) | set(sf["etaMax"]))
-    return Binning.parse_obj(
-        {
-            "nodetype": "binning",
-            "input": "eta",
-            "edges": edges,
-            "content": [
-                build_ptbinning(sf[(sf["etaMin"] >= lo) & (sf["etaMax"] <= hi)],syst,unc)
-                for lo, hi in zip(edges[:-1], edges[1:])
-            ],
-            "flow": "error",
-        }
-    )
+    return to_schema(emit(eta_tree(sf_columns(sf), np.arange(len(sf)), [syst], unc), 0))
+
+
+def eta_tree(cols, rows, systs, unc):
+    edges, bins = split_bins(cols, rows, "etaMin", "etaMax")
+    return BinningNode("eta", edges, [pt_tree(cols, inbin, systs, unc) for inbin in bins], "error")
 
 def build_ptbinning(sf,syst,unc):
-    edges = sorted(set(sf["ptMin"]) | set(sf["ptMax"]))
-    return Binning.parse_obj(
-        {
-            "nodetype": "binning",
-            "input": "pt",
-            "edges": edges,
-            "content": [
-                build_sf(sf[(sf["ptMin"] >= lo) & (sf["ptMax"] <= hi)],syst,unc)
-                for lo, hi in zip(edges[:-1], edges[1:])
-            ],
-            "flow": "error",
-        }
-    )
+    return to_schema(emit(pt_tree(sf_columns(sf), np.arange(len(sf)), [syst], unc), 0))
+
+
+def pt_tree(cols, rows, systs, unc):
+    edges, bins = split_bins(cols, rows, "ptMin", "ptMax")
+    rows = np.array([single_row(cols, inbin) for inbin in bins], dtype=int)
+    values = sf_values(cols, rows, systs, unc).tolist()
+    return BinningNode("pt", edges, [tuple(value) for value in values], "error")
 
 
 def build_sf(sf,syst,unc):
-    if len(sf) != 1:
-        raise ValueError(sf)
+    cols = sf_columns(sf)
+    row = single_row(cols, np.arange(len(sf)))
+    return float(sf_values(cols, [row], [syst], unc)[0, 0])
 
-    value= -99
-    if "nom" in syst:
-        value = sf.iloc[0]["scaleFactor"]
-    elif "up" in syst:
-        if unc:
-            value = sf.iloc[0]["scaleFactor"] +sf.iloc[0]["scaleFactorSystUncty_up"]
-        else:
-            value = sf.iloc[0]["scaleFactorSystUncty_up"]
-    elif "down" in syst:
-        if unc:
-            value = sf.iloc[0]["scaleFactor"] -sf.iloc[0]["scaleFactorSystUncty_down"]
+
+# values of all 'systs' for the given rows, one column per systematic
+def sf_values(cols, rows, systs, unc):
+    values = np.empty((len(rows), len(systs)))
+    for i, syst in enumerate(systs):
+        if "nom" in syst:
+            values[:, i] = cols["scaleFactor"][rows]
+        elif "up" in syst:
+            if unc:
+                values[:, i] = cols["scaleFactor"][rows].astype(float) + cols["scaleFactorSystUncty_up"][rows]
+            else:
+                values[:, i] = cols["scaleFactorSystUncty_up"][rows]
+        elif "down" in syst:
+            if unc:
+                values[:, i] = cols["scaleFactor"][rows].astype(float) - cols["scaleFactorSystUncty_down"][rows]
+            else:
+                values[:, i] = cols["scaleFactorSystUncty_down"][rows]
+        elif "MCEff" in syst:
+            values[:, i] = cols["MCEff"][rows]
         else:
-            value = sf.iloc[0]["scaleFactorSystUncty_down"]
-    elif "MCEff" in syst:
-        value = sf.iloc[0]["MCEff"]
-    else:
-        raise ValueError("No valid syst: nom, up, down")  
-    
+            raise ValueError("No valid syst: nom, up, down")
 
-    return value
+    return values
 
 
 
 
 def build_formula(sf,syst,inp = "discriminant"):
-    if len(sf) != 1:
-        raise ValueError(sf)
-    
-    value=-99
-    if "nom" in syst:
-        value = sf.iloc[0]["formula"]
-    elif "up" in syst:
-        value = sf.iloc[0]["formula_up"]
-    elif "down" in syst:
-        value = sf.iloc[0]["formula_down"]
-    else:
-        raise ValueError("No valid syst: nom, up, down")
+    return to_schema(emit(formula_leaf(sf_columns(sf), np.arange(len(sf)), [syst], inp), 0))
 
-    if "x" in value:
-        return Formula.parse_obj(
-            {
-                "nodetype": "formula",
-                "expression": value,
-                "parser": "TFormula",
-                "variables": [inp],
-                "parameters": [],
-            }
-        )
-    else:
-        return float(value)
 
-def build_softdrop_formula(sf,syst):
-    if len(sf) != 1:
-        raise ValueError(sf)
-    
-    value=-99
+def formula_column(syst):
     if "nom" in syst:
-        value = sf.iloc[0]["corr"] 
+        return "formula"
     elif "up" in syst:
-        value = sf.iloc[0]["formula_up"]
+        return "formula_up"
     elif "down" in syst:
-        value = sf.iloc[0]["formula_down"]
+        return "formula_down"
     else:
         raise ValueError("No valid syst: nom, up, down")
 
+
+def formula_node(value, inp, parameters=()):
     if "x" in value:
-        return Formula.parse_obj(
-            {
-                "nodetype": "formula",
-                "expression": value,
-                "parser": "TFormula",
-                "variables": ["discriminant"],
-                "parameters": [],
-            }
-        )
+        return FormulaNode(value, [inp], parameters)
     else:
         return float(value)
 
 
+# a node is created only once for each distinct formula column, e.g. when all systs use "nom"
+# the parameters ([0], [1], ...) of the formulas of a column are taken from the column COLUMN_parameters if it exists
+def formula_leaf(cols, rows, systs, inp):
+    row = single_row(cols, rows)
+    nodes = {}
+    for syst in systs:
+        column = formula_column(syst)
+        if column not in nodes:
+            parameters = cols[column + "_parameters"][row] if column + "_parameters" in cols else ()
+            nodes[column] = formula_node(cols[column][row], inp, parameters)
+    return tuple(nodes[formula_column(syst)] for syst in systs)
 
 def build_discrbinning(sf,syst):
-    edges = sorted(set(sf["discrMin"]) | set(sf["discrMax"]))
-    return Binning.parse_obj(
-        {
-            "nodetype": "binning",
-            "input": "discriminant",
-            "edges": edges,
-            "content": [
-                build_formula(sf[(sf["discrMin"] >= lo) & (sf["discrMax"] <= hi)],syst)
-                for lo, hi in zip(edges[:-1], edges[1:])
-            ],
-            "flow": "clamp",
-        }
-    )
+    return to_schema(emit(discr_tree(sf_columns(sf), np.arange(len(sf)), [syst]), 0))
+
+
+def discr_tree(cols, rows, systs):
+    edges, bins = split_bins(cols, rows, "discrMin", "discrMax")
+    content = [
+        tabulated_leaf(formula_leaf(cols, inbin, systs, "discriminant"), "discriminant", lo, hi)
+        for inbin, lo, hi in zip(bins, edges[:-1], edges[1:])
+    ]
+    return BinningNode("discriminant", edges, content, "clamp")
 
 
 def build_pts(sf,syst,withDisc):
-    edges = sorted(set(sf["ptMin"]) | set(sf["ptMax"]))
+    return to_schema(emit(pt_formula_tree(sf_columns(sf), np.arange(len(sf)), [syst], withDisc), 0))
+
+
+def pt_formula_tree(cols, rows, systs, withDisc):
+    edges, bins = split_bins(cols, rows, "ptMin", "ptMax")
     content=[]
     if withDisc:
-        content = [
-                build_discrbinning(sf[(sf["ptMin"] >= lo) & (sf["ptMax"] <= hi)],syst)
-                for lo, hi in zip(edges[:-1], edges[1:])
-            ]
+        content = [discr_tree(cols, inbin, systs) for inbin in bins]
 
     else:
         content = [
-                build_formula(sf[(sf["ptMin"] >= lo) & (sf["ptMax"] <= hi)],"nom","pt")
-                for lo, hi in zip(edges[:-1], edges[1:])
-            ]
+            tabulated_leaf(formula_leaf(cols, inbin, ["nom" for syst in systs], "pt"), "pt", lo, hi)
+            for inbin, lo, hi in zip(bins, edges[:-1], edges[1:])
+        ]
 
-    return Binning.parse_obj(
-        {
-            "nodetype": "binning",
-            "input": "pt",
-            "edges": edges,
-            "content": content,
-            "flow": "clamp",
-        }
-    )
+    return BinningNode("pt", edges, content, "clamp")
 
 def build_etas(sf,syst="nom",withDiscr = True):
-    edges = sorted(set(sf["etaMin"]) | set(sf["etaMax"]))
-    return Binning.parse_obj(
+    return to_schema(emit(eta_formula_tree(sf_columns(sf), np.arange(len(sf)), [syst], withDiscr), 0))
+
+
+def eta_formula_tree(cols, rows, systs, withDiscr):
+    edges, bins = split_bins(cols, rows, "etaMin", "etaMax")
+    content = [pt_formula_tree(cols, inbin, systs, withDiscr) for inbin in bins]
+    return BinningNode("eta", edges, content, "error")
+
+# 'generic_formulas': list to which the distinct formulas of the tree are appended, the formulas in the tree are then
+# replaced by references to them (see share_formulas); the list has to be given as generic_formulas of the correction
+def build_systs_formular(sf,withDisc = True, multibinning = True, fold = True, generic_formulas = None):
+    systs = ["nom", "up", "down"]
+    tree = eta_formula_tree(sf_columns(sf), np.arange(len(sf)), systs, withDisc)
+    if multibinning:
+        tree = merge_grids(tree)
+    tree = build_syst_category(tree, systs, fold)
+    if generic_formulas is not None:
+        formulas = []
+        tree = share_formulas(tree, formulas)
+        generic_formulas.extend(to_schema(formula) for formula in formulas)
+    return to_schema(tree)
+
+
+#### Shared formulas
+# The formula cells of a correction usually differ only in their parameters (e.g. the same polynomial with other
+# coefficients per bin, or another factor of the uncertainty per pt bin). 'share_formulas' writes every distinct
+# expression only once into 'formulas' (the generic_formulas of the correction) and replaces the cells by formularefs
+# with their parameters, so correctionlib parses every expression once and the json holds it once.
+def share_formulas(node, formulas):
+    if isinstance(node, FormulaNode):
+        generic = FormulaNode(node.expression, node.variables, (), node.parser)
+        if generic not in formulas:
+            formulas.append(generic)
+        return FormulaRefNode(formulas.index(generic), node.parameters)
+    if isinstance(node, (CategoryNode, BinningNode, MultiBinningNode)):
+        node = node.with_content([share_formulas(value, formulas) for value in node.content])
+        if isinstance(node, (BinningNode, MultiBinningNode)) and isinstance(node.flow, FormulaNode):
+            node.flow = share_formulas(node.flow, formulas)
+    return node
+
+
+#### Tabulated formulas (optional build mode)
+# With the environment variable JMAR_TABULATE=TOLERANCE (e.g. 1e-4) every formula of a single input is replaced by a
+# table over the bin it is valid in (the range of the fitted function, e.g. ptMin/ptMax of softdrop from the TF1
+# range), which is much cheaper to evaluate than the TFormula. The formula is sampled at 'tabulation_samples'+1 points
+# and the bins are chosen so that the relative deviation from it stays below the tolerance:
+#   JMAR_TABULATE=1e-4          constant bins (a binning of floats, tabulated by sfeval.py inside of the range)
+#   JMAR_TABULATE=linear:1e-4   linear bins ([0]+[1]*x, a formula of two parameters per bin)
+# The maximum relative error is checked again between the sample points and printed for every formula. Formulas for
+# which the tolerance can not be met (more than 'tabulation_max_bins' bins, or the formula crosses zero) are kept.
+# Outside of the range the table evaluates the original formula (flow), so only values inside the range change.
+tabulation_samples = 4096
+tabulation_max_bins = 1000
+
+
+def tabulation_option():
+    value = os.environ.get("JMAR_TABULATE", "off")
+    if value in ("", "0", "off"):
+        return None
+    kind, _, tolerance = value.rpartition(":")
+    kind = kind or "binned"
+    if kind not in ("binned", "linear"):
+        raise ValueError("JMAR_TABULATE has to be TOLERANCE, binned:TOLERANCE or linear:TOLERANCE, not " + value)
+    return kind, float(tolerance)
+
+
+# evaluates the formula at every x (one call per value, the vectorized evaluation of formulas is not reliable in all
+# correctionlib versions)
+def formula_values(node, x):
+    corr = Correction.parse_obj(
         {
-            "nodetype": "binning",
-            "input": "eta",
-            "edges": edges,
-            "content": [
-                build_pts(sf[(sf["etaMin"] >= lo) & (sf["etaMax"] <= hi)],syst,withDiscr)
-                for lo, hi in zip(edges[:-1], edges[1:])
-            ],
-            "flow": "error",
+            "version": 1,
+            "name": "formula",
+            "inputs": [{"name": node.variables[0], "type": "real"}],
+            "output": {"name": "value", "type": "real"},
+            "data": node.to_dict(),
         }
     )
+    evaluator = corr.to_evaluator()
+    return np.array([evaluator.evaluate(value) for value in x.tolist()])
 
-def build_systs_formular(sf,withDisc = True):
-    return Category.parse_obj(
-        {
-            "nodetype": "category",
-            "input": "systematic",
-            "content": [
-                {"key": "nom", "value": build_etas(sf,"nom",withDisc)},
-                {"key": "up", "value": build_etas(sf,"up",withDisc)},
-                {"key": "down", "value": build_etas(sf,"down",withDisc)}
-            ],
-        }
+
+# constant bins: grows every bin from the first sample on as long as the mid value of its samples is within the tolerance
+def constant_bins(x, f, tolerance):
+    edges, values = [x[0]], []
+    start, lo, hi, small = 0, f[0], f[0], abs(f[0])
+    for i in range(1, len(x)):
+        nlo, nhi, nsmall = min(lo, f[i]), max(hi, f[i]), min(small, abs(f[i]))
+        if (nhi - nlo) / 2 > tolerance * nsmall:
+            # the bin ends at the last sample that fits, the next one starts there
+            edges.append(x[i - 1])
+            values.append((lo + hi) / 2)
+            lo, hi, small = min(f[i - 1], f[i]), max(f[i - 1], f[i]), min(abs(f[i - 1]), abs(f[i]))
+            if (hi - lo) / 2 > tolerance * small:
+                return None
+        else:
+            lo, hi, small = nlo, nhi, nsmall
+        if len(values) > tabulation_max_bins:
+            return None
+    edges.append(x[-1])
+    values.append((lo + hi) / 2)
+    return edges, values
+
+
+# linear bins: splits every bin in the middle until the line through its end points is within the tolerance
+def linear_bins(x, f, tolerance):
+    cuts = [0]
+    pending = [(0, len(x) - 1)]
+    while pending:
+        i, j = pending.pop()
+        line = f[i] + (f[j] - f[i]) * (x[i : j + 1] - x[i]) / (x[j] - x[i])
+        if j - i > 1 and np.max(np.abs(line - f[i : j + 1]) - tolerance * np.abs(f[i : j + 1])) > 0:
+            pending += [(i + (j - i) // 2, j), (i, i + (j - i) // 2)]
+        else:
+            cuts.append(j)
+        if len(cuts) > tabulation_max_bins + 1:
+            return None
+    slopes = [(f[j] - f[i]) / (x[j] - x[i]) for i, j in zip(cuts[:-1], cuts[1:])]
+    return [x[i] for i in cuts], [(f[i] - slope * x[i], slope) for i, slope in zip(cuts[:-1], slopes)]
+
+
+def table_values(kind, edges, values, x):
+    ibin = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, len(values) - 1)
+    if kind == "binned":
+        return np.asarray(values)[ibin]
+    offsets, slopes = np.asarray(values).T
+    return offsets[ibin] + slopes[ibin] * x
+
+
+def tabulate_formula(node, inp, lo, hi, kind, tolerance):
+    x = np.linspace(lo, hi, tabulation_samples + 1)
+    f = formula_values(node, x)
+    mid = (x[:-1] + x[1:]) / 2
+    fmid = formula_values(node, mid)
+    description = inp + " formula in [" + str(lo) + ", " + str(hi) + "]"
+    if not (np.all(f > 0) or np.all(f < 0)) or not (np.all(fmid > 0) or np.all(fmid < 0)):
+        print("kept " + description + ": it is not of one sign, the relative error is not bounded")
+        return node
+    table = constant_bins(x, f, tolerance) if kind == "binned" else linear_bins(x, f, tolerance)
+    if table is None:
+        print("kept " + description + ": more than " + str(tabulation_max_bins) + " bins for tolerance " + str(tolerance))
+        return node
+    edges, values = table
+    error = max(
+        np.max(np.abs(table_values(kind, edges, values, x) / f - 1)),
+        np.max(np.abs(table_values(kind, edges, values, mid) / fmid - 1)),
+    )
+    if error > tolerance:
+        print("kept " + description + ": max relative error " + "%.3g" % error + " between the samples")
+        return node
+    print(
+        "tabulated " + description + ": " + str(len(values)) + " " + kind + " bins, max relative error "
+        + "%.3g" % error + " (tolerance " + str(tolerance) + ")"
     )
+    if kind == "linear":
+        content = [FormulaNode("[0]+[1]*x", [inp], [float(offset), float(slope)]) for offset, slope in values]
+    else:
+        content = [float(value) for value in values]
+    return BinningNode(inp, [float(edge) for edge in edges], content, node)
+
+
+# tables of the formulas already tabulated, every formula and range is only sampled once
+tables = {}
+
+
+# replaces the formulas of a leaf (tuple of the systematics) by tables over [lo, hi] if JMAR_TABULATE is set
+def tabulated_leaf(leaf, inp, lo, hi):
+    option = tabulation_option()
+    if option is None:
+        return leaf
+    content = []
+    for node in leaf:
+        if not (isinstance(node, FormulaNode) and node.variables == [inp]):
+            content.append(node)
+            continue
+        key = (node.expression, tuple(node.parameters), node.parser, inp, float(lo), float(hi), option)
+        if key not in tables:
+            tables[key] = tabulate_formula(node, inp, float(lo), float(hi), *option)
+        content.append(tables[key])
+    return tuple(content)
+
+
+
+#### Int coded category variants
+# add_int_categories(cset) appends to the CorrectionSet a copy NAME_int of every correction with string 'systematic' or
+# 'workingpoint' inputs in which these inputs are int categories, so that they can be evaluated with one NumPy int
+# code per jet instead of arrays of strings. The code of a key is its position in the first category of the input in the
+# tree (e.g. nom=0, up=1, down=2, MCEff=3), the mapping is written at the end of the description of the input as
+# 'codes: {"nom": 0, "up": 1, ...}' (read back by sfeval.py). The variants are only added if the environment variable
+# JMAR_INTCATEGORIES is set to 'on' (or with force=True).
+int_category_inputs = ["systematic", "workingpoint"]
+
+
+def int_categories_enabled():
+    return os.environ.get("JMAR_INTCATEGORIES", "off") not in ("", "0", "off")
+
+
+def category_keys(node, input, keys):
+    if isinstance(node, dict):
+        if node.get("nodetype") == "category" and node["input"] == input:
+            keys.extend(item["key"] for item in node["content"] if item["key"] not in keys)
+        for value in node.values():
+            category_keys(value, input, keys)
+    elif isinstance(node, list):
+        for value in node:
+            category_keys(value, input, keys)
+    return keys
+
+
+def recode_categories(node, codes):
+    if isinstance(node, dict):
+        node = {key: recode_categories(value, codes) for key, value in node.items()}
+        if node.get("nodetype") == "category" and node["input"] in codes:
+            node["content"] = [{"key": codes[node["input"]][item["key"]], "value": item["value"]} for item in node["content"]]
+        return node
+    if isinstance(node, list):
+        return [recode_categories(value, codes) for value in node]
+    return node
+
+
+def codes_description(description, codes):
+    return ((description + "; ") if description else "") + "codes: " + json.dumps(codes)
+
+
+def int_category_correction(corr, inputs = int_category_inputs, suffix = "_int"):
+    corr = corr.dict(exclude_unset=True)
+    codes = {}
+    for variable in corr["inputs"]:
+        if variable["name"] in inputs and variable["type"] == "string":
+            keys = category_keys(corr["data"], variable["name"], [])
+            codes[variable["name"]] = {key: code for code, key in enumerate(keys)}
+            variable["type"] = "int"
+            variable["description"] = codes_description(variable.get("description"), codes[variable["name"]])
+    if not codes:
+        return None
+    corr["name"] = corr["name"] + suffix
+    corr["description"] = (corr.get("description") or corr["name"][:-len(suffix)]) + " (int coded " + ", ".join(codes) + ")"
+    corr["data"] = recode_categories(corr["data"], codes)
+    return Correction.parse_obj(corr)
+
+
+def add_int_categories(cset, force = False):
+    if not (force or int_categories_enabled()):
+        return cset
+    variants = [int_category_correction(corr) for corr in cset.corrections]
+    cset.corrections = cset.corrections + [corr for corr in variants if corr is not None]
+    return cset
+
+
+# Writes 'cset' to 'path' one correction at a time instead of building the whole document as one string
+# (gzip compressed if 'path' ends with .gz). indent=None writes compact separators. Floats are written with
+# the shortest repr that round-trips, or rounded to 'precision' significant digits (edges are only rounded
+# if they stay strictly increasing). Returns the number of bytes written to disk.
+def write_cset(cset, path, indent=4, precision=None):
+    nl = "\n" if indent is not None else ""
+    pad = " " * indent if indent is not None else ""
+    sep = ": " if indent is not None else ":"
+    encoder = json.JSONEncoder(indent=indent, separators=(",", sep))
+
+    def encode(value, level):
+        if precision is not None:
+            value = round_floats(value, precision)
+        return encoder.encode(value).replace("\n", "\n" + pad * level)
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt") as fout:
+        fout.write("{")
+        fields = [key for key in cset.__fields__ if key in cset.__fields_set__]
+        for i, key in enumerate(fields):
+            fout.write(nl + pad + encoder.encode(key) + sep)
+            if key == "corrections" and len(cset.corrections):
+                fout.write("[")
+                for j, corr in enumerate(cset.corrections):
+                    fout.write(("," if j else "") + nl + pad * 2 + encode(corr.dict(exclude_unset=True), 2))
+                fout.write(nl + pad + "]")
+            else:
+                fout.write(encode(field_dict(getattr(cset, key)) if key != "corrections" else [], 1))
+            if i < len(fields) - 1:
+                fout.write(",")
+        fout.write(nl + "}")
+    return os.path.getsize(path)
+
+
+# the other fields of a CorrectionSet (e.g. compound_corrections) as plain json values
+def field_dict(value):
+    if hasattr(value, "dict"):
+        return value.dict(exclude_unset=True)
+    if isinstance(value, list):
+        return [field_dict(item) for item in value]
+    return value
+
+
+def round_floats(value, precision):
+    if isinstance(value, float):
+        return float("%.*g" % (precision, value))
+    if isinstance(value, list):
+        return [round_floats(item, precision) for item in value]
+    if isinstance(value, dict):
+        rounded = {key: round_floats(item, precision) for key, item in value.items()}
+        if value.get("nodetype") == "multibinning":
+            # every axis is checked on its own
+            rounded["edges"] = [
+                axis if increasing(axis) else original for axis, original in zip(rounded["edges"], value["edges"])
+            ]
+        elif "edges" in rounded and not increasing(rounded["edges"]):
+            rounded["edges"] = value["edges"]
+        return rounded
+    return value
+
+
+# edges (a list or a uniform binning) that are strictly increasing, infinite edges given as strings are skipped
+def increasing(edges):
+    if isinstance(edges, dict):
+        return edges["low"] < edges["high"]
+    return all(lo < hi for lo, hi in zip(edges[:-1], edges[1:]) if not isinstance(lo, str) and not isinstance(hi, str))
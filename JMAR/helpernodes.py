@@ -0,0 +1,169 @@
+from correctionlib.schemav2 import Binning, Category, Formula, FormulaRef, MultiBinning
+
+#### Lightweight nodes used by the helperfunctions while a correction tree is built.
+# Creating every node with Category/Binning/Formula.parse_obj runs a full pydantic validation (and copies the
+# children) at every level, and the same subtrees are validated again when they are wrapped into their parents.
+# The builders therefore only create these slotted nodes and the finished tree is converted and validated once
+# with 'to_schema' (or handed as plain dict from 'to_dict' to Correction.parse_obj).
+# A content is either a float or one of the nodes below (nodetypes without a node class are kept as plain dicts).
+
+
+class Node:
+    __slots__ = ()
+
+    # nodes compare equal if they describe the same subtree
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class CategoryNode(Node):
+    __slots__ = ("input", "keys", "content", "default")
+
+    def __init__(self, input, keys, content, default=None):
+        self.input = input
+        self.keys = keys
+        self.content = content
+        self.default = default
+
+    def with_content(self, content):
+        return CategoryNode(self.input, self.keys, content, self.default)
+
+    def to_dict(self):
+        node = {
+            "nodetype": "category",
+            "input": self.input,
+            "content": [{"key": key, "value": to_dict(value)} for key, value in zip(self.keys, self.content)],
+        }
+        if self.default is not None:
+            node["default"] = to_dict(self.default)
+        return node
+
+
+class BinningNode(Node):
+    __slots__ = ("input", "edges", "content", "flow")
+
+    def __init__(self, input, edges, content, flow="error"):
+        self.input = input
+        self.edges = edges
+        self.content = content
+        self.flow = flow
+
+    def with_content(self, content):
+        return BinningNode(self.input, self.edges, content, self.flow)
+
+    def to_dict(self):
+        return {
+            "nodetype": "binning",
+            "input": self.input,
+            "edges": self.edges,
+            "content": [to_dict(value) for value in self.content],
+            "flow": to_dict(self.flow),
+        }
+
+
+class MultiBinningNode(Node):
+    __slots__ = ("inputs", "edges", "content", "flow")
+
+    # content is the flattened (row-major) array of all bins, the last input runs fastest
+    def __init__(self, inputs, edges, content, flow="error"):
+        self.inputs = inputs
+        self.edges = edges
+        self.content = content
+        self.flow = flow
+
+    def with_content(self, content):
+        return MultiBinningNode(self.inputs, self.edges, content, self.flow)
+
+    def to_dict(self):
+        return {
+            "nodetype": "multibinning",
+            "inputs": self.inputs,
+            "edges": self.edges,
+            "content": [to_dict(value) for value in self.content],
+            "flow": to_dict(self.flow),
+        }
+
+
+class FormulaNode(Node):
+    __slots__ = ("expression", "variables", "parameters", "parser")
+
+    def __init__(self, expression, variables, parameters=(), parser="TFormula"):
+        self.expression = expression
+        self.variables = list(variables)
+        self.parameters = list(parameters)
+        self.parser = parser
+
+    def with_content(self, content):
+        return self
+
+    def to_dict(self):
+        return {
+            "nodetype": "formula",
+            "expression": self.expression,
+            "parser": self.parser,
+            "variables": list(self.variables),
+            "parameters": list(self.parameters),
+        }
+
+
+# reference to the formula 'index' of the generic_formulas of the correction, evaluated with 'parameters'
+class FormulaRefNode(Node):
+    __slots__ = ("index", "parameters")
+
+    def __init__(self, index, parameters=()):
+        self.index = index
+        self.parameters = list(parameters)
+
+    def with_content(self, content):
+        return self
+
+    def to_dict(self):
+        return {"nodetype": "formularef", "index": self.index, "parameters": list(self.parameters)}
+
+
+def to_dict(content):
+    if hasattr(content, "to_dict"):
+        return content.to_dict()
+    return content
+
+
+def to_schema(content):
+    if isinstance(content, CategoryNode):
+        return Category.parse_obj(content.to_dict())
+    if isinstance(content, BinningNode):
+        return Binning.parse_obj(content.to_dict())
+    if isinstance(content, MultiBinningNode):
+        return MultiBinning.parse_obj(content.to_dict())
+    if isinstance(content, FormulaNode):
+        return Formula.parse_obj(content.to_dict())
+    if isinstance(content, FormulaRefNode):
+        return FormulaRef.parse_obj(content.to_dict())
+    return float(content)
+
+
+def from_dict(content):
+    if not isinstance(content, dict):
+        return content
+    nodetype = content.get("nodetype")
+    if nodetype == "category":
+        keys = [item["key"] for item in content["content"]]
+        values = [from_dict(item["value"]) for item in content["content"]]
+        return CategoryNode(content["input"], keys, values, from_dict(content.get("default")))
+    if nodetype == "binning":
+        values = [from_dict(value) for value in content["content"]]
+        return BinningNode(content["input"], content["edges"], values, from_dict(content["flow"]))
+    if nodetype == "multibinning":
+        values = [from_dict(value) for value in content["content"]]
+        return MultiBinningNode(content["inputs"], content["edges"], values, from_dict(content["flow"]))
+    if nodetype == "formula":
+        return FormulaNode(
+            content["expression"], content["variables"], content.get("parameters") or (), content["parser"]
+        )
+    if nodetype == "formularef":
+        return FormulaRefNode(content["index"], content["parameters"])
+    return content
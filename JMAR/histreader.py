@@ -0,0 +1,137 @@
+import os
+from collections import namedtuple
+import numpy as np
+
+#### Reader layer for the ROOT inputs of the builder scripts
+# The builders only need whole histograms, graphs and fit functions, so instead of looping with GetBinContent/GetPoint
+# every object is returned at once as NumPy arrays:
+#   hist(name)     -> HistData: 'values' including under- and overflow (shape (nx+2,) or (nx+2, ny+2), same indices as
+#                     GetBinContent) and for every axis the bin edges 'lows'/'ups' with the same ROOT convention as
+#                     TAxis::GetBinLowEdge/GetBinUpEdge for the flow bins
+#   graph(name)    -> GraphData: points and asymmetric errors of a TGraphAsymmErrors
+#   function(name) -> FunctionData: title, parameters and range of a TF1
+# Two backends are available: "uproot" (no ROOT needed, default if installed) and "root" (PyROOT).
+# The backend can be chosen with open_file(path, backend) or with the environment variable JMAR_READER.
+
+HistData = namedtuple("HistData", ["values", "lows", "ups"])
+GraphData = namedtuple("GraphData", ["x", "y", "exlow", "exhigh", "eylow", "eyhigh"])
+FunctionData = namedtuple("FunctionData", ["title", "params", "xmin", "xmax"])
+
+backends = ["uproot", "root"]
+
+
+def axis_edges(nbins, xmin, xmax, xbins):
+    # low and up edge of the bins 0..nbins+1, as TAxis does it: fixed binning (and the flow bins) from fXmin/fXmax
+    ibin = np.arange(nbins + 2)
+    width = (xmax - xmin) / float(nbins)
+    lows = xmin + (ibin - 1) * width
+    ups = xmin + ibin * width
+    if len(xbins):
+        xbins = np.asarray(xbins, dtype=float)
+        lows[1:-1] = xbins[:-1]
+        ups[1:-1] = xbins[1:]
+    return lows, ups
+
+
+class UprootReader:
+    def __init__(self, path):
+        import uproot
+        self.file = uproot.open(path)
+
+    def keys(self):
+        names = []
+        for key in self.file.keys(recursive=False, cycle=False):
+            if key not in names:
+                names.append(key)
+        return names
+
+    def hist(self, name):
+        hist = self.file[name]
+        axes = [hist.member(axis) for axis in ["fXaxis", "fYaxis", "fZaxis"][:len(hist.axes)]]
+        edges = [axis_edges(axis.member("fNbins"), axis.member("fXmin"), axis.member("fXmax"), axis.member("fXbins")) for axis in axes]
+        return HistData(np.asarray(hist.values(flow=True), dtype=float), [lows for lows, ups in edges], [ups for lows, ups in edges])
+
+    def graph(self, name):
+        graph = self.file[name]
+        return GraphData(*[np.asarray(graph.member(member), dtype=float) for member in ["fX", "fY", "fEXlow", "fEXhigh", "fEYlow", "fEYhigh"]])
+
+    def function(self, name):
+        function = self.file[name]
+        # since ROOT 6 the parameters are stored in the TFormula, older TF1 versions keep them in fParams
+        formula = function.all_members.get("fFormula")
+        if formula is not None and formula.all_members.get("fClingParameters") is not None:
+            params = formula.member("fClingParameters")
+        else:
+            params = function.member("fParams")
+        params = [float(par) for par in params][:function.member("fNpar")]
+        return FunctionData(str(function.member("fTitle")), params, float(function.member("fXmin")), float(function.member("fXmax")))
+
+
+class RootReader:
+    def __init__(self, path):
+        import ROOT
+        self.file = ROOT.TFile.Open(path)
+        if not self.file or self.file.IsZombie():
+            raise IOError("could not open "+path)
+
+    def keys(self):
+        names = []
+        for key in self.file.GetListOfKeys():
+            if key.GetName() not in names:
+                names.append(key.GetName())
+        return names
+
+    def get(self, name):
+        obj = self.file.Get(name)
+        if not obj:
+            raise KeyError(name)
+        return obj
+
+    def hist(self, name):
+        hist = self.get(name)
+        axes = [hist.GetXaxis(), hist.GetYaxis(), hist.GetZaxis()][:hist.GetDimension()]
+        shape = [axis.GetNbins() + 2 for axis in axes]
+        # GetArray is ordered with x running fastest
+        values = np.array(np.frombuffer(hist.GetArray(), dtype=hist_dtype(hist), count=int(np.prod(shape))), dtype=float)
+        values = values.reshape(shape[::-1]).T
+        edges = [axis_edges(axis.GetNbins(), axis.GetXmin(), axis.GetXmax(), np.frombuffer(axis.GetXbins().GetArray(), dtype=np.float64, count=axis.GetXbins().GetSize()) if axis.GetXbins().GetSize() else []) for axis in axes]
+        return HistData(values, [lows for lows, ups in edges], [ups for lows, ups in edges])
+
+    def graph(self, name):
+        graph = self.get(name)
+        n = graph.GetN()
+        arrays = [graph.GetX(), graph.GetY(), graph.GetEXlow(), graph.GetEXhigh(), graph.GetEYlow(), graph.GetEYhigh()]
+        return GraphData(*[np.array(np.frombuffer(array, dtype=np.float64, count=n)) for array in arrays])
+
+    def function(self, name):
+        function = self.get(name)
+        params = [function.GetParameter(ipar) for ipar in range(function.GetNpar())]
+        return FunctionData(str(function.GetTitle()), params, function.GetXmin(), function.GetXmax())
+
+
+# TH1F/TH2F/... inherit from the TArray holding their contents
+def hist_dtype(hist):
+    for array, dtype in [("TArrayD", np.float64), ("TArrayF", np.float32), ("TArrayI", np.int32), ("TArrayS", np.int16), ("TArrayC", np.int8)]:
+        if hist.InheritsFrom(array):
+            return dtype
+    return np.float64
+
+
+def default_backend():
+    backend = os.environ.get("JMAR_READER")
+    if backend:
+        return backend
+    try:
+        import uproot
+        return "uproot"
+    except ImportError:
+        return "root"
+
+
+def open_file(path, backend=None):
+    backend = backend or default_backend()
+    if backend == "uproot":
+        return UprootReader(path)
+    if backend == "root":
+        return RootReader(path)
+    raise ValueError("unknown reader backend '"+str(backend)+"', use one of "+", ".join(backends))
@@ -0,0 +1,131 @@
+import os, json, hashlib, shutil
+import numpy as np
+import pandas as pd
+
+#### Columnar cache for the scale factor tables extracted by the builder scripts
+# cached_table(name, sources, extract) returns the DataFrame of extract(). The first time it is written to
+#   CACHEDIR/name-HASH/ with one .npy file per column (and columns.json with the column names and dtypes),
+# the next builds memory-map these files instead of reading the ROOT/CSV inputs again.
+# HASH is computed from the table name, 'version', the content of the source files and the code of the extraction
+# (the bytecode of 'extract' and of the functions of its module that it calls, see code_hash), so the cache is rebuilt
+# automatically when an input or the extraction code changes, but not when only the json layout in the builder script
+# changes. Change 'version' if the extraction depends on other code that changes (e.g. histreader.py).
+# String columns are stored as fixed width unicode arrays and converted back to python strings.
+# The cache directory is '.sfcache' in the working directory, it can be set with the environment variable JMAR_SFCACHE
+# ('off' disables the cache).
+
+bprintouts=False
+
+defaultdir = ".sfcache"
+
+
+def cache_dir():
+    return os.environ.get("JMAR_SFCACHE", defaultdir)
+
+
+def source_hash(name, sources, version=1, extract=None):
+    sha = hashlib.sha256()
+    sha.update((name+"\0"+str(version)).encode())
+    if extract is not None:
+        sha.update(code_hash(extract).encode())
+    for source in sources:
+        sha.update(b"\0"+os.path.basename(source).encode()+b"\0")
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+    return sha.hexdigest()[:16]
+
+
+#### hash of the code of an extract function: its bytecode and constants and the ones of the functions of the same
+#### module it calls (recursively), e.g. extract_table called from a lambda. The rest of the builder script (the json
+#### layout) is not part of it, so changing it does not invalidate the cache
+def code_hash(extract):
+    sha = hashlib.sha256()
+    update_function(sha, extract, set())
+    return sha.hexdigest()
+
+
+def update_function(sha, function, seen):
+    code = getattr(function, "__code__", None)
+    if code is None or code in seen:
+        return
+    seen.add(code)
+    update_code(sha, code)
+    called = [function.__globals__.get(name) for name in code_names(code)]
+    called += [cell.cell_contents for cell in function.__closure__ or () if cell.cell_contents is not None]
+    for value in called:
+        if callable(value) and getattr(value, "__module__", None) == function.__module__:
+            update_function(sha, value, seen)
+
+
+# global names used by a code object and the code objects nested in it, in the order of the code
+def code_names(code):
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            names += code_names(const)
+    return names
+
+
+# nested code objects (e.g. a lambda inside of extract) are hashed by their content, their repr has an address
+def update_code(sha, code):
+    sha.update(code.co_code)
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            update_code(sha, const)
+        else:
+            sha.update(repr(const).encode())
+
+
+def write_table(df, path):
+    tmp = path+".tmp"+str(os.getpid())
+    os.makedirs(tmp)
+    dtypes = []
+    for i, column in enumerate(df.columns):
+        values = df[column].to_numpy()
+        if values.dtype == object:
+            values = np.array(values.tolist())
+            if values.dtype.kind != "U":
+                shutil.rmtree(tmp)
+                raise TypeError("column '"+str(column)+"' can not be cached, only numbers and strings are supported")
+            dtypes.append("object")
+        else:
+            dtypes.append(values.dtype.str)
+        np.save(os.path.join(tmp, str(i)+".npy"), values)
+    with open(os.path.join(tmp, "columns.json"), "w") as f:
+        json.dump({"columns": list(df.columns), "dtypes": dtypes, "rows": len(df)}, f)
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        # written in the meantime by another build
+        shutil.rmtree(tmp)
+
+
+def read_table(path):
+    with open(os.path.join(path, "columns.json")) as f:
+        info = json.load(f)
+    data = {}
+    for i, (column, dtype) in enumerate(zip(info["columns"], info["dtypes"])):
+        values = np.load(os.path.join(path, str(i)+".npy"), mmap_mode="r")
+        data[column] = values.astype(object) if dtype == "object" else values
+    return pd.DataFrame(data, columns=info["columns"], index=pd.RangeIndex(info["rows"]))
+
+
+def cached_table(name, sources, extract, version=1, cachedir=None):
+    cachedir = cachedir or cache_dir()
+    if cachedir == "off":
+        return extract()
+    path = os.path.join(cachedir, name+"-"+source_hash(name, sources, version, extract))
+    if os.path.isdir(path):
+        if bprintouts: print("reading "+name+" from "+path)
+        return read_table(path)
+    df = extract()
+    os.makedirs(cachedir, exist_ok=True)
+    # remove the tables of older versions of the sources
+    for entry in os.listdir(cachedir):
+        if entry.startswith(name+"-") and len(entry) == len(os.path.basename(path)) and entry != os.path.basename(path):
+            shutil.rmtree(os.path.join(cachedir, entry), ignore_errors=True)
+    df = df.reset_index(drop=True)
+    write_table(df, path)
+    if bprintouts: print("cached "+name+" in "+path)
+    return df
@@ -0,0 +1,563 @@
+import gzip, hashlib, json, os, re
+import numpy as np
+import correctionlib
+
+#### Evaluation of all systematic variations of a JMAR correction in one call
+# All JMAR corrections have the systematic ("nom", "up", "down", "MCEff") as outermost category, so evaluating every
+# variation with correctionlib means one evaluate call per variation, each searching the same eta/pt bins again.
+#   sf = FusedCorrection.from_file("2018_jmar.json", "PUJetID_eff")
+#   values = sf.evaluate(eta, pt, "L")            # shape (number of jets, number of systematics)
+#   values = sf.evaluate(eta, pt, wps, structured=True)
+#   values["nom"], values["up"], values["down"]
+# The inputs are the ones of the correction without the systematic, in the same order. Category inputs (e.g. the
+# working point) can be a single value or one value per jet.
+# For corrections with binned constants (DeepAK8, Top tagging, Wtagging, PUJetID) the correction is tabulated once:
+# the edges of every binned input are merged over the whole tree (so every cell of the merged grid is inside one bin
+# of every subtree, including the under- and overflow) and every cell is evaluated once with correctionlib for all
+# category keys and systematics. An evaluation then needs one searchsorted per binned input and one gather that
+# returns all systematics. Cells where correctionlib raises (e.g. outside an 'error' binning) raise a ValueError when
+# they are used. Corrections with formulas (Gluon_Pythia, JMS) or category defaults are evaluated with correctionlib
+# jet by jet (the vectorized evaluate of correctionlib 2.3 returns the value of the first jet for all jets), which is
+# much slower. Binnings with a formula as flow (JMAR_TABULATE in helperfunctionsv2.py) are tabulated inside of their
+# range, only the jets outside of it are evaluated with correctionlib.
+# The int coded variants NAME_int (see add_int_categories in helperfunctionsv2.py) take one NumPy int code per jet for
+# the systematic and the working point, the codes are read from the input descriptions:
+#   sf = FusedCorrection.from_file("UL18_jmar.json.gz", "PUJetID_eff_int")
+#   values = sf.evaluate(eta, pt, sf.encode("workingpoint", ["L", "T", ...]), structured=True)   # or the codes directly
+
+bprintouts=False
+
+
+class NotTabulable(Exception):
+    pass
+
+
+def read_correction(path, name):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        for correction in json.load(f)["corrections"]:
+            if correction["name"] == name:
+                return correction
+    raise KeyError("no correction "+name+" in "+path)
+
+
+#### string -> code mapping of the int coded inputs, from the end of the input description ('codes: {"L": 0, ...}')
+def input_codes(variable):
+    match = re.search(r"codes: (\{.*\})$", variable.get("description") or "")
+    return json.loads(match.group(1)) if match else None
+
+
+#### correctionlib evaluator of one correction (parsed by correctionlib directly, without the pydantic schema)
+def correction_evaluator(correction):
+    cset = correctionlib.CorrectionSet.from_string(json.dumps({"schema_version": 2, "corrections": [correction]}))
+    return cset[correction["name"]]
+
+
+def binning_edges(node):
+    edges = node["edges"]
+    if isinstance(edges, dict):
+        # uniform binning
+        return np.linspace(edges["low"], edges["high"], edges["n"]+1)
+    return np.asarray(edges, dtype=float)
+
+
+#### collects the edges of every binned input and the keys of every category input of a tree
+# binnings with a formula as flow (e.g. the tables of JMAR_TABULATE) are tabulated inside of their edges, the range of
+# every input outside of which the formula is used is appended to 'flows' ([input, low, high])
+def collect(node, edges, keys, flows):
+    if not isinstance(node, dict):
+        return
+    nodetype = node["nodetype"]
+    if nodetype == "binning":
+        edges.setdefault(node["input"], set()).update(binning_edges(node).tolist())
+        children = list(node["content"])
+        if isinstance(node["flow"], dict):
+            children += flow_children(node, [node["input"]], [binning_edges(node)], flows)
+    elif nodetype == "multibinning":
+        alledges = [binning_edges({"edges": node["edges"][i]}) for i in range(len(node["inputs"]))]
+        for input, inputedges in zip(node["inputs"], alledges):
+            edges.setdefault(input, set()).update(inputedges.tolist())
+        children = list(node["content"])
+        if isinstance(node["flow"], dict):
+            children += flow_children(node, node["inputs"], alledges, flows)
+    elif nodetype == "category":
+        if node.get("default") is not None:
+            raise NotTabulable("category with default")
+        keys.setdefault(node["input"], [])
+        for item in node["content"]:
+            if item["key"] not in keys[node["input"]]:
+                keys[node["input"]].append(item["key"])
+        children = [item["value"] for item in node["content"]]
+    else:
+        raise NotTabulable(nodetype)
+    for child in children:
+        collect(child, edges, keys, flows)
+
+
+def flow_children(node, inputs, alledges, flows):
+    if node["flow"]["nodetype"] not in ("formula", "formularef"):
+        return [node["flow"]]
+    flows.extend([input, float(inputedges[0]), float(inputedges[-1])] for input, inputedges in zip(inputs, alledges))
+    return []
+
+
+#### correctionlib evaluation jet by jet: the vectorized evaluate of correctionlib 2.3 (with NumPy 2) returns the value
+# of the first jet for every jet, so everything that is not tabulated is evaluated one jet at a time
+def evaluate_each(evaluator, values, types):
+    shape = np.broadcast_shapes(*[np.shape(value) for value in values])
+    columns = []
+    for value, type in zip(values, types):
+        value = np.asarray(value, dtype=float) if type == "real" else np.asarray(value)
+        columns.append(np.broadcast_to(value, shape).ravel().tolist())
+    return np.array([evaluator.evaluate(*row) for row in zip(*columns)], dtype=float).reshape(shape)
+
+
+class FusedCorrection:
+    def __init__(self, correction, systematic="systematic", systematics=None):
+        if not isinstance(correction, dict):
+            correction = json.loads(correction.json(exclude_unset=True))
+        self.name = correction["name"]
+        self.evaluator = correction_evaluator(correction)
+        names = [variable["name"] for variable in correction["inputs"]]
+        if systematic not in names:
+            raise ValueError(self.name+" has no input "+systematic)
+        self.systematic_position = names.index(systematic)
+        self.inputs = [name for name in names if name != systematic]
+        self.input_types = [variable["type"] for variable in correction["inputs"] if variable["name"] != systematic]
+        if systematics is None:
+            systematics = [item["key"] for item in correction["data"]["content"]] if correction["data"].get("input") == systematic else []
+        self.systematics = list(systematics)
+        self.mapping = {}
+        for variable in correction["inputs"]:
+            codes = input_codes(variable)
+            if codes is not None:
+                self.mapping[variable["name"]] = codes
+        # names of the systematics (the keys of the int coded variants are codes)
+        names = {code: key for key, code in self.mapping.get(systematic, {}).items()}
+        self.systematic_names = [str(names.get(syst, syst)) for syst in self.systematics]
+        # the correction itself is only kept for the corrections (or cells) evaluated with correctionlib
+        self.correction = None
+        try:
+            self.build_table(correction, systematic)
+        except NotTabulable as reason:
+            if bprintouts: print(self.name+" is evaluated with correctionlib ("+str(reason)+")")
+            self.table = None
+            self.correction = correction
+        if self.table is not None and self.fallback.any():
+            self.correction = correction
+
+    @classmethod
+    def from_file(cls, path, name, systematic="systematic", systematics=None):
+        return cls(read_correction(path, name), systematic, systematics)
+
+    def arguments(self, values, systematic):
+        arguments = list(values)
+        arguments.insert(self.systematic_position, systematic)
+        return arguments
+
+    #### table of all systematics in every cell of the merged grid and every combination of category keys
+    def build_table(self, correction, systematic):
+        edges, keys, flows = {}, {}, []
+        collect(correction["data"], edges, keys, flows)
+        keys.pop(systematic, None)
+        unknown = [name for name in self.inputs if name not in edges and name not in keys]
+        if unknown:
+            raise NotTabulable("inputs not used in binnings or categories: "+", ".join(unknown))
+        self.set_axes({name: np.array(sorted(values)) for name, values in edges.items()}, keys)
+        # cell i of a binned input: [edges[i-1], edges[i]), cell 0 and the last cell are the under- and overflow
+        points = []
+        for name in self.inputs:
+            if name in self.edges:
+                points.append(np.concatenate([[self.edges[name][0]-1.0], self.edges[name]]))
+            else:
+                points.append(self.keys[name])
+        shape = tuple(len(values) for values in points)
+        table = np.full(shape+(len(self.systematics),), np.nan)
+        valid = np.zeros(table.shape, dtype=bool)
+        for index in np.ndindex(*shape):
+            values = [points[i][j] for i, j in enumerate(index)]
+            for k, syst in enumerate(self.systematics):
+                try:
+                    table[index+(k,)] = self.evaluator.evaluate(*self.arguments(values, syst))
+                    valid[index+(k,)] = True
+                except Exception:
+                    pass
+        # cells outside of the range of a binning with a formula flow are evaluated with correctionlib
+        fallback = np.zeros(shape, dtype=bool)
+        for name, low, high in flows:
+            axis = self.inputs.index(name)
+            outside = (points[axis] < low) | (points[axis] >= high)
+            fallback |= outside.reshape([-1 if i == axis else 1 for i in range(len(shape))])
+        valid[fallback] = False
+        self.set_table(table, valid, fallback)
+
+    def set_axes(self, edges, keys):
+        self.edges = edges
+        self.keys = keys
+        self.codes = {name: {key: code for code, key in enumerate(values)} for name, values in keys.items()}
+        # int keys are looked up in an array instead of a dict
+        self.code_arrays = {}
+        for name, values in keys.items():
+            if all(isinstance(key, int) and key >= 0 for key in values):
+                self.code_arrays[name] = np.full(max(values)+1, -1, dtype=np.intp)
+                self.code_arrays[name][values] = np.arange(len(values))
+
+    def set_table(self, table, valid, fallback):
+        self.table = table
+        self.valid = valid
+        self.fallback = fallback
+        self.flat_table = self.table.reshape(-1, len(self.systematics))
+        self.flat_valid = self.valid.reshape(-1, len(self.systematics)).all(axis=1)
+        self.flat_fallback = self.fallback.ravel()
+
+    #### everything needed to rebuild the FusedCorrection: a json-serializable dict and the numpy arrays
+    def state(self):
+        meta = {
+            "name": self.name,
+            "inputs": self.inputs,
+            "input_types": self.input_types,
+            "systematic_position": self.systematic_position,
+            "systematics": self.systematics,
+            "systematic_names": self.systematic_names,
+            "mapping": self.mapping,
+            "correction": self.correction,
+        }
+        arrays = {}
+        if self.table is not None:
+            meta["keys"] = self.keys
+            meta["edges"] = list(self.edges)
+            arrays = {"table": self.table, "valid": self.valid, "fallback": self.fallback}
+            arrays.update(("edges"+str(i), self.edges[name]) for i, name in enumerate(meta["edges"]))
+        return meta, arrays
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        self = cls.__new__(cls)
+        for name in ["name", "inputs", "input_types", "systematic_position", "systematics", "systematic_names", "mapping", "correction"]:
+            setattr(self, name, meta[name])
+        self.evaluator = None if self.correction is None else correction_evaluator(self.correction)
+        if "edges" in meta:
+            self.set_axes({name: arrays["edges"+str(i)] for i, name in enumerate(meta["edges"])}, meta["keys"])
+            self.set_table(arrays["table"], arrays["valid"], arrays["fallback"])
+        else:
+            self.table = None
+        return self
+
+    def category_codes(self, name, values):
+        codes = self.codes[name]
+        if values.ndim == 0:
+            if values.item() not in codes:
+                raise KeyError("unknown "+name+" "+str(values.item())+" in "+self.name)
+            return np.intp(codes[values.item()])
+        if name in self.code_arrays and values.dtype.kind in "iu":
+            lookup = self.code_arrays[name]
+            inside = (values >= 0) & (values < len(lookup))
+            indices = lookup.take(np.where(inside, values, 0))
+            unknown = ~inside | (indices < 0)
+            if np.any(unknown):
+                raise KeyError("unknown "+name+" "+str(values[unknown][0])+" in "+self.name)
+            return indices
+        unique, inverse = np.unique(values, return_inverse=True)
+        lookup = []
+        for key in unique.tolist():
+            if key not in codes:
+                raise KeyError("unknown "+name+" "+str(key)+" in "+self.name)
+            lookup.append(codes[key])
+        return np.asarray(lookup, dtype=np.intp)[inverse]
+
+    def cell_indices(self, values):
+        indices = []
+        for name, value in zip(self.inputs, values):
+            if name in self.edges:
+                indices.append(np.searchsorted(self.edges[name], value.astype(float), side="right"))
+            else:
+                indices.append(self.category_codes(name, value))
+        return indices
+
+    def evaluate(self, *values, structured=False):
+        if len(values) != len(self.inputs):
+            raise ValueError(self.name+" needs the inputs "+", ".join(self.inputs))
+        values = [np.asarray(value) for value in values]
+        shape = np.broadcast_shapes(*[value.shape for value in values])
+        if self.table is None:
+            result = self.evaluate_each([np.broadcast_to(value, shape).ravel() for value in values])
+        else:
+            indices = np.broadcast_arrays(*self.cell_indices(values))
+            flat = np.ravel_multi_index(indices, self.table.shape[:-1]).ravel()
+            fallback = self.flat_fallback.take(flat)
+            bad = np.flatnonzero(~self.flat_valid.take(flat) & ~fallback)
+            if len(bad):
+                raise ValueError(
+                    self.name+": inputs outside of the correction: "
+                    + ", ".join(name+"="+str(np.broadcast_to(value, shape).ravel()[bad[0]]) for name, value in zip(self.inputs, values))
+                )
+            result = self.flat_table.take(flat, axis=0)
+            each = np.flatnonzero(fallback)
+            if len(each):
+                result[each] = self.evaluate_each([np.broadcast_to(value, shape).ravel()[each] for value in values])
+        result = result.reshape(shape+(len(self.systematics),))
+        if structured:
+            return result.view([(syst, result.dtype) for syst in self.systematic_names])[..., 0]
+        return result
+
+    #### int codes of the keys of an int coded input, e.g. encode("workingpoint", ["L", "T"])
+    def encode(self, name, keys):
+        codes = self.mapping[name]
+        unique, inverse = np.unique(np.asarray(keys), return_inverse=True)
+        return np.asarray([codes[key] for key in unique.tolist()], dtype=np.int64)[inverse].reshape(np.shape(keys))
+
+    #### correctionlib evaluation of every systematic, jet by jet (see evaluate_each)
+    def evaluate_each(self, values):
+        result = np.empty((len(values[0]), len(self.systematics)))
+        types = self.arguments(self.input_types, None)
+        for k, syst in enumerate(self.systematics):
+            result[:, k] = evaluate_each(self.evaluator, self.arguments(values, syst), types)
+        return result
+
+
+#### Bundles with a binary cache
+# load_bundle(path) returns {name: FusedCorrection} for all corrections of a (gzip compressed) json. Building the
+# tables of a bundle takes a few hundred ms, so they are written once to a binary cache next to the bundle
+# (PATH.fused.npz: the tables as .npy arrays and the rest as json, no pickles) and read from there by later loads.
+# The cache stores the sha256 of the bundle file and is rebuilt when the content of the bundle changes. A cache that can
+# not be written (e.g. a read-only directory) is skipped, cache=False never uses one and cache=PATH puts it elsewhere.
+cache_version = 2
+
+
+def cache_path(path):
+    return path+".fused.npz"
+
+
+def read_cache(cachefile, digest):
+    with np.load(cachefile, allow_pickle=False) as cache:
+        meta = json.loads(cache["meta"].item())
+        if meta["hash"] != digest or meta["version"] != cache_version:
+            return None
+        blobs = {dtype: cache["blob"+str(i)] for i, dtype in enumerate(meta["dtypes"])}
+    corrections = {}
+    for state in meta["corrections"]:
+        arrays = {}
+        for name, (dtype, start, shape) in state.pop("arrays").items():
+            arrays[name] = blobs[dtype][start:start+int(np.prod(shape))].reshape(shape)
+        corrections[state["name"]] = FusedCorrection.from_state(state, arrays)
+    return corrections
+
+
+#### all arrays of one dtype are stored in one blob (one .npy member each instead of one per array)
+def write_cache(cachefile, digest, corrections):
+    meta = {"hash": digest, "version": cache_version, "dtypes": [], "corrections": []}
+    blobs = {}
+    for correction in corrections.values():
+        state, arrays = correction.state()
+        state["arrays"] = {}
+        for name, array in arrays.items():
+            parts = blobs.setdefault(array.dtype.str, [])
+            start = sum(len(part) for part in parts)
+            parts.append(array.ravel())
+            state["arrays"][name] = [array.dtype.str, start, list(array.shape)]
+        meta["corrections"].append(state)
+    meta["dtypes"] = list(blobs)
+    arrays = {"blob"+str(i): np.concatenate(parts) for i, parts in enumerate(blobs.values())}
+    tmp = cachefile+".tmp"+str(os.getpid())
+    with open(tmp, "wb") as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp, cachefile)
+
+
+def load_bundle(path, cache=True):
+    with open(path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    cachefile = cache_path(path) if cache is True else cache
+    if cachefile and os.path.exists(cachefile):
+        try:
+            corrections = read_cache(cachefile, digest)
+        except (OSError, ValueError, KeyError) as error:
+            if bprintouts: print("can not read "+cachefile+": "+str(error))
+            corrections = None
+        if corrections is not None:
+            if bprintouts: print("read "+path+" from "+cachefile)
+            return corrections
+    text = gzip.decompress(raw) if path.endswith(".gz") else raw
+    corrections = {correction["name"]: FusedCorrection(correction) for correction in json.loads(text)["corrections"]}
+    if cachefile:
+        try:
+            write_cache(cachefile, digest, corrections)
+        except OSError as error:
+            if bprintouts: print("can not write "+cachefile+": "+str(error))
+    return corrections
+
+#### Lazy loading of single corrections of a bundle
+# jsonformat.py writes an index next to every bundle (PATH.index.json) with the byte range of every correction in the
+# file. For gzip compressed bundles every correction is a separate gzip member (the file is still a normal gzip file),
+# so a correction can be read and decompressed without the rest of the bundle:
+#   cset = LazyCorrectionSet("UL18_jmar.json.gz")
+#   sf = cset["PUJetID_eff"]                       # only this correction is read and parsed
+#   fused = cset.fused("PUJetID_eff")              # FusedCorrection of it
+# The index also holds the sha256 of every byte range and of the rest of the file (the frame), the frame is checked
+# when the set is opened and a byte range when its correction is read. Without an index (or when the index does not
+# match the bundle, e.g. the bundle was replaced) the whole bundle is parsed once, as with
+# correctionlib.CorrectionSet.from_file.
+index_version = 2
+
+def index_path(path):
+    return path+".index.json"
+
+
+class LazyCorrectionSet:
+    def __init__(self, path):
+        self.path = path
+        self.evaluators = {}
+        self.corrections = {}
+        self.index = None
+        try:
+            with open(index_path(path)) as f:
+                index = json.load(f)
+            if (index.get("version") == index_version and index["size"] == os.path.getsize(path)
+                    and self.frame_matches(index)):
+                self.index = index
+            elif bprintouts: print(index_path(path)+" does not match "+path+", reading the whole bundle")
+        except (OSError, ValueError, KeyError) as error:
+            if bprintouts: print("can not read "+index_path(path)+": "+str(error))
+        if self.index is None:
+            self.read_all()
+            return
+        self.names = list(self.index["corrections"])
+        self.schema_version = self.index["schema_version"]
+        self.description = self.index["description"]
+
+    #### the bytes before the first and after the last correction (schema_version, description, ...) are unchanged
+    def frame_matches(self, index):
+        ranges = list(index["corrections"].values())
+        first = ranges[0][0] if ranges else index["size"]
+        last = ranges[-1][0]+ranges[-1][1] if ranges else index["size"]
+        with open(self.path, "rb") as f:
+            data = f.read(first)
+            f.seek(last)
+            data += f.read()
+        return hashlib.sha256(data).hexdigest() == index["frame"]
+
+    def read_all(self):
+        self.index = None
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "rt") as f:
+            cset = json.load(f)
+        self.corrections = {correction["name"]: correction for correction in cset["corrections"]}
+        self.names = list(self.corrections)
+        self.schema_version = cset["schema_version"]
+        self.description = cset.get("description")
+
+    def correction(self, name):
+        """json (dict) of one correction"""
+        if name not in self.corrections:
+            if self.index is None or name not in self.index["corrections"]:
+                raise KeyError("no correction "+name+" in "+self.path)
+            offset, length, sha = self.index["corrections"][name]
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                data = f.read(length)
+            if hashlib.sha256(data).hexdigest() != sha:
+                # the bundle changed since the index was written
+                if bprintouts: print(index_path(self.path)+" does not match "+self.path+", reading the whole bundle")
+                self.read_all()
+                return self.correction(name)
+            if self.index["compression"] == "gzip":
+                data = gzip.decompress(data)
+            # a gzip member also holds the separator to the next correction
+            correction = json.JSONDecoder().raw_decode(data.decode())[0]
+            if correction.get("name") != name:
+                raise ValueError(index_path(self.path)+" points to "+str(correction.get("name"))+" instead of "+name)
+            self.corrections[name] = correction
+        return self.corrections[name]
+
+    def fused(self, name, **options):
+        return FusedCorrection(self.correction(name), **options)
+
+    def __getitem__(self, name):
+        if name not in self.evaluators:
+            self.evaluators[name] = correction_evaluator(self.correction(name))
+        return self.evaluators[name]
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def keys(self):
+        return list(self.names)
+
+
+#### Jagged evaluation: a variable number of jets per event
+# The jets of all events are stored in flat buffers (eta, pt, ...) and event i has the jets offsets[i]:offsets[i+1]
+# (offsets_from_counts converts the number of jets per event). evaluate_jagged runs the correction once on views of the
+# flat buffers, without copying them, and returns a Jagged with the results in the same layout. A FusedCorrection is
+# evaluated on the whole buffer, any other correctionlib correction jet by jet (see evaluate_each):
+#   sfs = evaluate_jagged(sf, offsets, jet_eta, jet_pt, "L")
+#   sfs[i]                 # values of the jets of event i
+#   sfs.content            # flat values of all jets
+# Awkward arrays (e.g. from uproot) can be used directly with evaluate_awkward(sf, events.Jet_eta, events.Jet_pt, "L"),
+# which returns an awkward array with the same number of jets per event.
+def offsets_from_counts(counts):
+    offsets = np.zeros(len(counts)+1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+
+class Jagged:
+    __slots__ = ("offsets", "content")
+
+    def __init__(self, offsets, content):
+        self.offsets = offsets
+        self.content = content
+
+    @property
+    def counts(self):
+        return np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets)-1
+
+    def __getitem__(self, event):
+        return self.content[self.offsets[event]:self.offsets[event+1]]
+
+    def tolist(self):
+        return [self[event].tolist() for event in range(len(self))]
+
+
+#### FusedCorrections are evaluated on the whole buffer, correctionlib corrections jet by jet (see evaluate_each)
+def evaluate_flat(correction, values, options):
+    if isinstance(correction, FusedCorrection):
+        return correction.evaluate(*values, **options)
+    if options:
+        raise TypeError("options "+", ".join(options)+" are only supported for a FusedCorrection")
+    return evaluate_each(correction, values, [variable.type for variable in correction.inputs])
+
+
+def evaluate_jagged(correction, offsets, *values, **options):
+    offsets = np.asarray(offsets)
+    start, stop = int(offsets[0]), int(offsets[-1])
+    flat = []
+    for value in values:
+        if np.ndim(value):
+            value = np.asarray(value)
+            if len(value) < stop:
+                raise ValueError("flat buffer of "+str(len(value))+" jets for offsets up to "+str(stop))
+            value = value[start:stop]
+        flat.append(value)
+    content = evaluate_flat(correction, flat, options)
+    return Jagged(offsets if start == 0 else offsets-start, content)
+
+
+def evaluate_awkward(correction, *values, **options):
+    import awkward as ak
+
+    jagged = [value for value in values if isinstance(value, ak.Array)]
+    if not jagged:
+        raise ValueError("no awkward array in the inputs")
+    counts = ak.num(jagged[0], axis=1)
+    flat = [ak.to_numpy(ak.flatten(value, axis=1)) if isinstance(value, ak.Array) else value for value in values]
+    return ak.unflatten(evaluate_flat(correction, flat, options), counts)
@@ -0,0 +1,259 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from MetPhiCorrections_Corrector import MetPhiCorrector
+
+# applies a MET phi correction of a json in ../corrections to the MET columns of an event file, chunk by chunk
+#     python ApplyMetPhiCorrections.py ../corrections/met_2018_UL.json.gz metphicorr_pfmet_data events.parquet corrected.parquet
+# the input (.parquet, .feather/.arrow or .npz) is read in chunks of --chunk-size events, the next chunk is read while
+# the current one is corrected, and the corrected pt and phi (corrmet_pt, corrmet_phi) are written to the output file
+# (same formats) chunk by chunk, so the memory needed does not depend on the size of the file. The output is written to
+# OUTFILE.tmp and renamed when all events are corrected, after an error there is no output file.
+# Parquet and Feather files need pyarrow.
+
+# names of the inputs of the corrections
+inputs = ["met_pt", "met_phi", "npvs", "run"]
+
+# names of the outputs
+outputs = ["corrmet_pt", "corrmet_phi"]
+
+
+# file formats by extension
+extensions = {".parquet": "parquet", ".pq": "parquet", ".feather": "feather", ".arrow": "feather", ".ipc": "feather",
+              ".npz": "npz"}
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in extensions:
+        return extensions[extension]
+    raise ValueError("unknown file format of {}, use .parquet, .feather/.arrow or .npz".format(path))
+
+
+class ParquetSource:
+    def __init__(self, path, columns):
+        import pyarrow.parquet as pq
+
+        self.file = pq.ParquetFile(path)
+        self.columns = columns
+        self.length = self.file.metadata.num_rows
+
+    def chunks(self, chunk_size):
+        for batch in self.file.iter_batches(batch_size=chunk_size, columns=self.columns):
+            yield {name: batch.column(name).to_numpy(zero_copy_only=False) for name in self.columns}
+
+
+class FeatherSource:
+    def __init__(self, path, columns):
+        import pyarrow as pa
+
+        # memory mapped, the batches are only read when they are converted
+        self.reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+        self.columns = columns
+        self.length = sum(self.reader.get_batch(i).num_rows for i in range(self.reader.num_record_batches))
+
+    def chunks(self, chunk_size):
+        for i in range(self.reader.num_record_batches):
+            batch = self.reader.get_batch(i)
+            for start in range(0, batch.num_rows, chunk_size):
+                chunk = batch.slice(start, chunk_size)
+                yield {name: chunk.column(name).to_numpy(zero_copy_only=False) for name in self.columns}
+
+
+class NpzSource:
+    """reads the .npy members of a (compressed) .npz file sequentially, without loading them completely"""
+
+    def __init__(self, path, columns):
+        self.archive = zipfile.ZipFile(path)
+        self.columns = columns
+        self.streams, self.dtypes, lengths = {}, {}, []
+        for name in columns:
+            stream = self.archive.open(name + ".npy")
+            version = np.lib.format.read_magic(stream)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+            if len(shape) != 1 or dtype.hasobject:
+                raise ValueError("column {} is not a one dimensional array of numbers".format(name))
+            self.streams[name], self.dtypes[name] = stream, dtype
+            lengths.append(shape[0])
+        if len(set(lengths)) > 1:
+            raise ValueError("the columns {} have different lengths {}".format(columns, lengths))
+        self.length = lengths[0]
+
+    def chunks(self, chunk_size):
+        for start in range(0, self.length, chunk_size):
+            count = min(chunk_size, self.length - start)
+            chunk = {}
+            for name in self.columns:
+                data = self.streams[name].read(count * self.dtypes[name].itemsize)
+                chunk[name] = np.frombuffer(data, dtype=self.dtypes[name])
+            yield chunk
+
+
+class ParquetSink:
+    def __init__(self, path, length):
+        self.path = path
+        self.writer = None
+
+    def write(self, chunk):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table(chunk)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class FeatherSink:
+    def __init__(self, path, length):
+        self.path = path
+        self.writer = None
+
+    def write(self, chunk):
+        import pyarrow as pa
+
+        batch = pa.record_batch(list(chunk.values()), names=list(chunk))
+        if self.writer is None:
+            self.writer = pa.ipc.new_file(self.path, batch.schema)
+        self.writer.write_batch(batch)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class NpzSink:
+    """writes every column to a memory mapped .npy file and packs them into the .npz at the end"""
+
+    def __init__(self, path, length):
+        self.path = path
+        self.length = length
+        self.tmpdir = tempfile.mkdtemp(prefix=".npz-", dir=os.path.dirname(os.path.abspath(path)))
+        self.arrays = {}
+        self.written = 0
+
+    def write(self, chunk):
+        count = len(next(iter(chunk.values())))
+        for name, values in chunk.items():
+            if name not in self.arrays:
+                self.arrays[name] = np.lib.format.open_memmap(
+                    os.path.join(self.tmpdir, name + ".npy"), mode="w+", dtype=values.dtype, shape=(self.length,)
+                )
+            self.arrays[name][self.written : self.written + count] = values
+        self.written += count
+
+    def close(self):
+        try:
+            for array in self.arrays.values():
+                array.flush()
+            self.arrays = {}
+            with zipfile.ZipFile(self.path, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+                for filename in sorted(os.listdir(self.tmpdir)):
+                    archive.write(os.path.join(self.tmpdir, filename), filename)
+        finally:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+sources = {"parquet": ParquetSource, "feather": FeatherSource, "npz": NpzSource}
+sinks = {"parquet": ParquetSink, "feather": FeatherSink, "npz": NpzSink}
+
+
+def prefetched(chunks):
+    """iterates over the chunks, reading the next one in a background thread"""
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(next, chunks, None)
+        while True:
+            chunk = future.result()
+            if chunk is None:
+                return
+            future = pool.submit(next, chunks, None)
+            yield chunk
+
+
+def apply_correction(corrector, infile, outfile, chunk_size=1000000, columns=None, copy=(), prefetch=True):
+    """corrects the MET of infile chunk by chunk and writes the corrected pt and phi (and the 'copy' columns) to outfile
+
+    columns: names of the input columns in the file, if they differ from met_pt, met_phi, npvs, run
+    returns the number of corrected events
+    """
+    columns = dict(columns or {})
+    names = {name: columns.get(name, name) for name in inputs}
+    if corrector.edges is None and names["run"] not in copy:
+        # simulation does not need the run number
+        del names["run"]
+    read = list(dict.fromkeys(list(names.values()) + list(copy)))
+    source = sources[file_format(infile)](infile, read)
+    # the output is written to a temporary file that only replaces outfile when all chunks are corrected, so that a
+    # failure does not leave a complete looking file with missing events
+    tmpfile = outfile + ".tmp"
+    sink = sinks[file_format(outfile)](tmpfile, source.length)
+    chunks = source.chunks(chunk_size)
+    nevents = 0
+    try:
+        try:
+            for chunk in prefetched(chunks) if prefetch else chunks:
+                run = chunk[names["run"]] if "run" in names else None
+                pt, phi = corrector(chunk[names["met_pt"]], chunk[names["met_phi"]], chunk[names["npvs"]], run)
+                result = dict(zip(outputs, [pt, phi]))
+                result.update((name, chunk[name]) for name in copy)
+                sink.write(result)
+                nevents += len(pt)
+        finally:
+            sink.close()
+    except BaseException:
+        if os.path.exists(tmpfile):
+            os.remove(tmpfile)
+        raise
+    # Parquet and Feather sinks do not create a file without chunks
+    if os.path.exists(tmpfile):
+        os.replace(tmpfile, outfile)
+    return nevents
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="apply a MET phi correction to the MET columns of an event file")
+    parser.add_argument("corrections", help="json with the MET phi corrections, e.g. ../corrections/met_2018_UL.json.gz")
+    parser.add_argument("label", help="correction label, e.g. metphicorr_pfmet_data (pt_LABEL is used)")
+    parser.add_argument("infile", help="input events (.parquet, .feather/.arrow, .npz)")
+    parser.add_argument("outfile", help="output with the corrected columns (.parquet, .feather/.arrow, .npz)")
+    parser.add_argument("-c", "--chunk-size", type=int, default=1000000, help="events per chunk (default: 1000000)")
+    parser.add_argument(
+        "--columns",
+        default="",
+        help="input column names, if they are different, e.g. met_pt=MET_pt,met_phi=MET_phi,npvs=PV_npvs",
+    )
+    parser.add_argument("--copy", nargs="*", default=[], help="input columns that are copied to the output")
+    parser.add_argument("--no-prefetch", action="store_true", help="read the chunks in the main thread")
+    args = parser.parse_args(argv)
+
+    columns = dict(item.split("=", 1) for item in args.columns.split(",") if item)
+    unknown = set(columns) - set(inputs)
+    if unknown:
+        parser.error("unknown inputs in --columns: {}".format(", ".join(sorted(unknown))))
+    corrector = MetPhiCorrector.from_json(args.corrections, args.label)
+    start = time.time()
+    nevents = apply_correction(
+        corrector, args.infile, args.outfile, args.chunk_size, columns, args.copy, not args.no_prefetch
+    )
+    seconds = time.time() - start
+    print("corrected {} events in {:.1f}s ({:.3g} events/s), written to {}".format(
+        nevents, seconds, nevents / max(seconds, 1e-9), args.outfile
+    ))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
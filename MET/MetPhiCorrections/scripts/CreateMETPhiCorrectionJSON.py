@@ -0,0 +1,115 @@
+import gzip
+import os
+import correctionlib.schemav2 as cs
+from correctionlib.JSONEncoder import dumps
+from MetPhiCorrections_Utility import MetPhiCorrectionsHelper as helper
+import MetPhiCorrections_parameters_ul as parameters
+
+# creates the MET phi correction jsons of all MET types and samples from the parameter table in
+# MetPhiCorrections_parameters_ul.py: per era one json per MET type and sample (metphicorr_MET_SAMPLE_ERA_ul.json.gz)
+# and the merged json of the era (met_ERA_UL.json.gz), all in ../corrections
+#     python CreateMETPhiCorrectionJSON.py [ERA ...]
+
+# MET types and samples: description used in the jsons
+met_types = {"pfmet": "Type 1 PFMET", "puppimet": "Type 1 PuppiMET"}
+samples = {"data": "data", "mc": "MC/simulation"}
+
+# era name of the merged jsons
+bundle_eras = {"2016pre": "2016preVFP", "2016post": "2016postVFP", "2017": "2017", "2018": "2018"}
+
+outdir = os.path.join("..", "corrections")
+
+# build targets: arguments of create_corr, the files they write and the input files they read (used by jsonformat.py in the top directory)
+targets = [
+    {
+        "args": ["2016pre"],
+        "outputs": [
+            "../corrections/metphicorr_pfmet_data_2016pre_ul.json.gz",
+            "../corrections/metphicorr_pfmet_mc_2016pre_ul.json.gz",
+            "../corrections/metphicorr_puppimet_data_2016pre_ul.json.gz",
+            "../corrections/metphicorr_puppimet_mc_2016pre_ul.json.gz",
+            "../corrections/met_2016preVFP_UL.json.gz",
+        ],
+    },
+    {
+        "args": ["2016post"],
+        "outputs": [
+            "../corrections/metphicorr_pfmet_data_2016post_ul.json.gz",
+            "../corrections/metphicorr_pfmet_mc_2016post_ul.json.gz",
+            "../corrections/metphicorr_puppimet_data_2016post_ul.json.gz",
+            "../corrections/metphicorr_puppimet_mc_2016post_ul.json.gz",
+            "../corrections/met_2016postVFP_UL.json.gz",
+        ],
+    },
+    {
+        "args": ["2017"],
+        "outputs": [
+            "../corrections/metphicorr_pfmet_data_2017_ul.json.gz",
+            "../corrections/metphicorr_pfmet_mc_2017_ul.json.gz",
+            "../corrections/metphicorr_puppimet_data_2017_ul.json.gz",
+            "../corrections/metphicorr_puppimet_mc_2017_ul.json.gz",
+            "../corrections/met_2017_UL.json.gz",
+        ],
+    },
+    {
+        "args": ["2018"],
+        "outputs": [
+            "../corrections/metphicorr_pfmet_data_2018_ul.json.gz",
+            "../corrections/metphicorr_pfmet_mc_2018_ul.json.gz",
+            "../corrections/metphicorr_puppimet_data_2018_ul.json.gz",
+            "../corrections/metphicorr_puppimet_mc_2018_ul.json.gz",
+            "../corrections/met_2018_UL.json.gz",
+        ],
+    },
+]
+
+
+def correction_set(era, met, sample):
+    """CorrectionSet with the pt and phi correction of one MET type and sample"""
+    label = "metphicorr_{}_{}".format(met, sample)
+    corrections, edges = parameters.corrections(era, met, sample)
+    if sample == "data":
+        pt_metphicorr = helper.MetPhiCorrection_Data_pt(label, met_types[met], corrections, edges)
+        phi_metphicorr = helper.MetPhiCorrection_Data_phi(label, met_types[met], corrections, edges)
+    else:
+        pt_metphicorr = helper.MetPhiCorrection_MC_pt(label, met_types[met], corrections)
+        phi_metphicorr = helper.MetPhiCorrection_MC_phi(label, met_types[met], corrections)
+    return cs.CorrectionSet(
+        schema_version=2,
+        description="{} Phi Corrections for {}".format(met_types[met], samples[sample]),
+        corrections=[pt_metphicorr, phi_metphicorr],
+    )
+
+
+def write_gzip(text, path):
+    # without timestamp, so that the same content gives the same file
+    with open(path, "wb") as f, gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as fout:
+        fout.write(text.encode())
+
+
+def create_corr(era):
+    """writes the jsons of one era, returns the merged CorrectionSet"""
+    filenames = []
+    corrections = []
+    for met in met_types:
+        for sample in samples:
+            cset = correction_set(era, met, sample)
+            filename = "metphicorr_{}_{}_{}_ul.json.gz".format(met, sample, era)
+            write_gzip(cset.json(exclude_unset=True, indent=4), os.path.join(outdir, filename))
+            filenames.append(filename)
+            corrections += cset.corrections
+    # merged json, in the format of 'correction merge --format pretty'
+    merged = cs.CorrectionSet(
+        schema_version=2, description="Merged from " + " ".join(filenames), corrections=corrections
+    )
+    write_gzip(dumps(merged) + "\n", os.path.join(outdir, "met_{}_UL.json.gz".format(bundle_eras[era])))
+    return merged
+
+
+if __name__ == "__main__":
+    import sys
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    for era in sys.argv[1:] or parameters.eras:
+        create_corr(era)
+        print("written the jsons of {}".format(era))
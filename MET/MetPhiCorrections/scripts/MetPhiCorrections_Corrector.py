@@ -0,0 +1,135 @@
+import gzip
+import json
+import numpy as np
+from MetPhiCorrections_Utility import MetPhiCorrectionsHelper as helper
+import MetPhiCorrections_parameters_ul as parameter_table
+
+
+class MetPhiCorrector:
+    """
+    vectorized MET XY correction that returns the corrected pt and phi of MET together
+
+    the x/y components and the trigonometric functions are computed once per event and both outputs are derived from
+    them. The results are the same as the ones of the pt_*/phi_* corrections in the jsons (same formulas, same bins,
+    an error for values outside of the binning).
+
+    the parameters are looked up in precomputed tables, so that the lookup does not depend on the number of run bins:
+    - run_table: parameter row of every run from the first to the last run edge (the run edges are integers, so the bin
+      of a run is the one of floor(run)). Non-integer edges fall back to np.searchsorted.
+    - offsets: the x and y offsets ([0]*npvs+[1], [2]*npvs+[3]) of every parameter row and integer npvs up to npvs_max,
+      stored flat (row * (npvs_max+1) + npvs), other npvs are computed directly.
+    so applying the correction to integer runs and npvs needs two gathers.
+    """
+
+    def __init__(self, parameters, edges=None, npvs_max=255):
+        """
+        parameters: one row [x slope, x offset, y slope, y offset] per run bin (a single row for simulation), a row of
+        NaN means no correction in this run bin
+        edges: run bin edges for data, None for simulation (the run number is not used)
+        npvs_max: largest number of vertices in the offset table
+        """
+        self.parameters = np.asarray(parameters, dtype=float).reshape(-1, 4)
+        self.edges = None if edges is None else np.asarray(edges, dtype=float)
+        if self.edges is not None and len(self.edges) != len(self.parameters) + 1:
+            raise ValueError("{} run edges for {} parameter rows".format(len(self.edges), len(self.parameters)))
+        if self.edges is None and len(self.parameters) != 1:
+            raise ValueError("simulation needs exactly one parameter row, not {}".format(len(self.parameters)))
+        self.uncorrected = np.isnan(self.parameters[:, 0])
+        self.build_run_table()
+        self.build_offsets(npvs_max)
+
+    def build_run_table(self):
+        self.run_table = None
+        if self.edges is None or np.any(self.edges != np.floor(self.edges)):
+            return
+        self.run_base = int(self.edges[0])
+        runs = np.arange(self.run_base, int(self.edges[-1]), dtype=float)
+        self.run_table = (np.searchsorted(self.edges, runs, side="right") - 1).astype(np.int32)
+
+    def build_offsets(self, npvs_max):
+        self.npvs_max = npvs_max
+        npvs = np.arange(npvs_max + 1, dtype=float)
+        self.offsets = np.stack(
+            [
+                self.parameters[:, 0, None] * npvs + self.parameters[:, 1, None],
+                self.parameters[:, 2, None] * npvs + self.parameters[:, 3, None],
+            ],
+            axis=-1,
+        ).reshape(-1, 2)
+
+    @classmethod
+    def from_table(cls, era, met, sample):
+        """corrector from the parameter table in MetPhiCorrections_parameters_ul.py, e.g. ('2018', 'pfmet', 'data')"""
+        rows, edges = parameter_table.parameter_rows(era, met, sample)
+        return cls([[np.nan] * 4 if params is None else params for params in rows], edges)
+
+    @classmethod
+    def from_json(cls, path, label):
+        """corrector from the pt_LABEL correction of a (gzip compressed) json, e.g. label='metphicorr_pfmet_data'"""
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt") as f:
+            corrections = {correction["name"]: correction for correction in json.load(f)["corrections"]}
+        correction = corrections["pt_{}".format(label)]
+        formulas = [formula["expression"] for formula in correction["generic_formulas"]]
+        # met_pt binning -> met_phi binning -> run binning (data) or the formula (simulation)
+        node = correction["data"]["content"][0]["content"][0]
+        if node["nodetype"] == "binning":
+            edges, refs = node["edges"], node["content"]
+        else:
+            edges, refs = None, [node]
+        rows = []
+        for ref in refs:
+            if formulas[ref["index"]] == helper.pt_calculation:
+                rows.append(ref["parameters"])
+            elif formulas[ref["index"]] == "x":
+                rows.append([np.nan] * 4)
+            else:
+                raise ValueError("unknown formula in {}: {}".format(path, formulas[ref["index"]]))
+        return cls(rows, edges)
+
+    def rows(self, run):
+        """index of the parameter row of every event (the run bin for data)"""
+        if self.edges is None:
+            return np.zeros(np.shape(run), dtype=np.intp)
+        run = np.asarray(run, dtype=float)
+        outside = ~((run >= self.edges[0]) & (run < self.edges[-1]))
+        if np.any(outside):
+            raise ValueError("run {} outside of the run binning".format(run[outside][0]))
+        if self.run_table is None:
+            return np.searchsorted(self.edges, run, side="right") - 1
+        return self.run_table.take(run.astype(np.intp) - self.run_base)
+
+    def offsets_of(self, rows, npvs):
+        """x and y offsets of every event, from the table if all npvs are integers in its range"""
+        index = npvs.astype(np.intp)
+        if np.size(npvs) and np.all(npvs == index) and index.min() >= 0 and index.max() <= self.npvs_max:
+            offsets = self.offsets.take(rows * (self.npvs_max + 1) + index, axis=0)
+            return offsets[..., 0], offsets[..., 1]
+        params = self.parameters[rows]
+        return params[..., 0] * npvs + params[..., 1], params[..., 2] * npvs + params[..., 3]
+
+    def check_range(self, name, values, low, high):
+        outside = ~((values >= low) & (values < high))
+        if np.any(outside):
+            raise ValueError("{} {} outside of [{}, {})".format(name, values[outside][0], low, high))
+
+    def correct(self, pt, phi, npvs, run=None):
+        """returns the corrected (pt, phi) of MET for arrays of the uncorrected pt, phi, number of vertices and run"""
+        pt = np.asarray(pt, dtype=float)
+        phi = np.asarray(phi, dtype=float)
+        npvs = np.asarray(npvs, dtype=float)
+        self.check_range("met_pt", pt, 0.0, helper.pt_max)
+        self.check_range("met_phi", phi, -helper.phi_max, helper.phi_max)
+        rows = self.rows(pt if run is None else run)
+        offset_x, offset_y = self.offsets_of(rows, npvs)
+        x = pt * np.cos(phi) - offset_x
+        y = pt * np.sin(phi) - offset_y
+        corrected_pt = np.sqrt(x**2 + y**2)
+        # same case distinction as MetPhiCorrectionsHelper.phi_calculation
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corrected_phi = np.where(x != 0, np.arctan(y / x), 0.0) + (x <= 0) * np.sign(y) * 3.14159
+        # run bins without correction
+        uncorrected = self.uncorrected.take(rows)
+        return np.where(uncorrected, pt, corrected_pt), np.where(uncorrected, phi, corrected_phi)
+
+    __call__ = correct
@@ -6,8 +6,17 @@ class MetPhiCorrectionsHelper:
     utility class to create MET Phi Correction jsons
     """
 
-    # phi calculation string
-    phi_calculation = (
+    # x and y components of the corrected MET (x: met_pt, y: met_phi, z: npvs)
+    met_x = "(x*cos(y)-([0]*z+[1]))"
+    met_y = "(x*sin(y)-([2]*z+[3]))"
+
+    # phi calculation string: atan(met_y/met_x), shifted by +-3.14159 if met_x<0, +-3.14159 if met_x==0
+    # same case distinction as the five branches of phi_calculation_legacy, so the values do not change,
+    # but met_x/met_y are evaluated 7 instead of 20 times and atan once instead of three times
+    phi_calculation = "({x}!=0)*atan({y}/{x})+({x}<=0)*(({y}>0)-({y}<0))*3.14159".format(x=met_x, y=met_y)
+
+    # phi calculation string of the first versions of the jsons (used by TestMetPhiFormula.py)
+    phi_calculation_legacy = (
         "(((x*cos(y)-([0]*z+[1]))==0)*((x*sin(y)-([2]*z+[3]))>0))*3.14159+"
         "(((x*cos(y)-([0]*z+[1]))==0)*((x*sin(y)-([2]*z+[3]))<0))*(-3.14159)+"
         "((x*cos(y)-([0]*z+[1]))>0)*atan((x*sin(y)-([2]*z+[3]))/(x*cos(y)-([0]*z+[1])))+"
@@ -17,7 +26,7 @@ class MetPhiCorrectionsHelper:
     )
 
     # pt calculation string
-    pt_calculation = "sqrt((x*cos(y)-([0]*z+[1]))^2+(x*sin(y)-([2]*z+[3]))^2)"
+    pt_calculation = "sqrt({x}^2+{y}^2)".format(x=met_x, y=met_y)
 
     # maximum allowed pt of MET
     pt_max = 6500.0
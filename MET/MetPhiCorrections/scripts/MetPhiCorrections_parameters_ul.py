@@ -0,0 +1,159 @@
+### XY Corrections for Type 1 PFMET and PuppiMET in Run II UL data and MC/simulation ###
+
+# one row per run bin (data) or per era (MC/simulation), the corrected MET components are
+#   x: met_pt*cos(met_phi) - (x_slope*npvs + x_offset)
+#   y: met_pt*sin(met_phi) - (y_slope*npvs + y_offset)
+# run bins with '-' as parameters are not corrected, the run bins of an era have to be contiguous
+# met: pfmet (Type 1 PFMET) or puppimet (Type 1 PuppiMET), sample: data or mc
+table = """
+# era     met       sample  run_min  run_max  period     x_slope      x_offset    y_slope       y_offset
+2016pre   pfmet     data    0        272007   -          -            -           -             -
+2016pre   pfmet     data    272007   275377   2016B      -0.0214894   -0.188255   0.0876624     0.812885
+2016pre   pfmet     data    275377   275657   -          -            -           -             -
+2016pre   pfmet     data    275657   276284   2016C      -0.032209    0.067288    0.113917      0.743906
+2016pre   pfmet     data    276284   276315   -          -            -           -             -
+2016pre   pfmet     data    276315   276812   2016D      -0.0293663   0.21106     0.11331       0.815787
+2016pre   pfmet     data    276812   276831   -          -            -           -             -
+2016pre   pfmet     data    276831   277421   2016E      -0.0132046   0.20073     0.134809      0.679068
+2016pre   pfmet     data    277421   277772   -          -            -           -             -
+2016pre   pfmet     data    277772   278769   2016Fpre   -0.0543566   0.816597    0.114225      1.17266
+2016pre   pfmet     data    278769   278770   -          -            -           -             -
+2016pre   pfmet     data    278770   278771   2016Fpre   -0.0543566   0.816597    0.114225      1.17266
+
+2016pre   pfmet     mc      -        -        -          -0.188743    0.136539    0.0127927     0.117747
+
+2016pre   puppimet  data    0        272007   -          -            -           -             -
+2016pre   puppimet  data    272007   275377   2016B      -0.00109025  -0.338093   -0.00356058   0.128407
+2016pre   puppimet  data    275377   275657   -          -            -           -             -
+2016pre   puppimet  data    275657   276284   2016C      -0.00271913  -0.342268   0.00187386    0.104
+2016pre   puppimet  data    276284   276315   -          -            -           -             -
+2016pre   puppimet  data    276315   276812   2016D      -0.00254194  -0.305264   -0.00177408   0.164639
+2016pre   puppimet  data    276812   276831   -          -            -           -             -
+2016pre   puppimet  data    276831   277421   2016E      -0.00358835  -0.225435   -0.000444268  0.180479
+2016pre   puppimet  data    277421   277772   -          -            -           -             -
+2016pre   puppimet  data    277772   278769   2016Fpre   0.0056759    -0.454101   -0.00962707   0.35731
+2016pre   puppimet  data    278769   278770   -          -            -           -             -
+2016pre   puppimet  data    278770   278771   2016Fpre   0.0056759    -0.454101   -0.00962707   0.35731
+
+2016pre   puppimet  mc      -        -        -          -0.0060447   -0.4183     0.008331      -0.0990046
+
+2016post  pfmet     data    0        278769   -          -            -           -             -
+2016post  pfmet     data    278769   278770   2016Fpost  0.134616     -0.89965    0.0397736     1.0385
+2016post  pfmet     data    278770   278771   -          -            -           -             -
+2016post  pfmet     data    278771   278801   -          -            -           -             -
+2016post  pfmet     data    278801   278809   2016Fpost  0.134616     -0.89965    0.0397736     1.0385
+2016post  pfmet     data    278809   278820   -          -            -           -             -
+2016post  pfmet     data    278820   280386   2016G      0.121809     -0.584893   0.0558974     0.891234
+2016post  pfmet     data    280386   280919   -          -            -           -             -
+2016post  pfmet     data    280919   284045   2016H      0.0868828    -0.703489   0.0888774     0.902632
+
+2016post  pfmet     mc      -        -        -          -0.153497    -0.231751   0.00731978    0.243323
+
+2016post  puppimet  data    0        278769   -          -            -           -             -
+2016post  puppimet  data    278769   278770   2016Fpost  0.0234421    -0.371298   -0.00997438   0.0809178
+2016post  puppimet  data    278770   278771   -          -            -           -             -
+2016post  puppimet  data    278771   278801   -          -            -           -             -
+2016post  puppimet  data    278801   278809   2016Fpost  0.0234421    -0.371298   -0.00997438   0.0809178
+2016post  puppimet  data    278809   278820   -          -            -           -             -
+2016post  puppimet  data    278820   280386   2016G      0.0182134    -0.335786   -0.0063338    0.093349
+2016post  puppimet  data    280386   280919   -          -            -           -             -
+2016post  puppimet  data    280919   284045   2016H      0.015702     -0.340832   -0.00544957   0.199093
+
+2016post  puppimet  mc      -        -        -          -0.0058341   -0.395049   0.00971595    -0.101288
+
+2017      pfmet     data    0        297020   -          -            -           -             -
+2017      pfmet     data    297020   299330   2017B      -0.211161    0.419333    0.251789      -1.28089
+2017      pfmet     data    299330   299337   -          -            -           -             -
+2017      pfmet     data    299337   302030   2017C      -0.185184    -0.164009   0.200941      -0.56853
+2017      pfmet     data    302030   303435   2017D      -0.201606    0.426502    0.188208      -0.58313
+2017      pfmet     data    303435   304827   2017E      -0.162472    0.176329    0.138076      -0.250239
+2017      pfmet     data    304827   304911   -          -            -           -             -
+2017      pfmet     data    304911   306463   2017F      -0.210639    0.72934     0.198626      1.028
+
+2017      pfmet     mc      -        -        -          -0.300155    1.90608     0.300213      -2.02232
+
+2017      puppimet  data    0        297020   -          -            -           -             -
+2017      puppimet  data    297020   299330   2017B      -0.00382117  -0.666228   0.0109034     0.172188
+2017      puppimet  data    299330   299337   -          -            -           -             -
+2017      puppimet  data    299337   302030   2017C      -0.00110699  -0.747643   -0.0012184    0.303817
+2017      puppimet  data    302030   303435   2017D      -0.00141442  -0.721382   -0.0011873    0.21646
+2017      puppimet  data    303435   304827   2017E      0.00593859   -0.851999   -0.00754254   0.245956
+2017      puppimet  data    304827   304911   -          -            -           -             -
+2017      puppimet  data    304911   306463   2017F      0.00765682   -0.945001   -0.0154974    0.804176
+
+2017      puppimet  mc      -        -        -          -0.0102265   -0.446416   0.0198663     0.243182
+
+2018      pfmet     data    0        315252   -          -            -           -             -
+2018      pfmet     data    315252   316996   2018A      0.263733     -1.91115    0.0431304     -0.112043
+2018      pfmet     data    316996   316998   -          -            -           -             -
+2018      pfmet     data    316998   319313   2018B      0.400466     -3.05914    0.146125      -0.533233
+2018      pfmet     data    319313   320394   2018C      0.430911     -1.42865    0.0620083     -1.46021
+2018      pfmet     data    320394   325274   2018D      0.457327     -1.56856    0.0684071     -0.928372
+
+2018      pfmet     mc      -        -        -          0.183518     0.546754    0.192263      -0.42121
+
+2018      puppimet  data    0        315252   -          -            -           -             -
+2018      puppimet  data    315252   316996   2018A      -0.0073377   0.0250294   -0.000406059  0.0417346
+2018      puppimet  data    316996   316998   -          -            -           -             -
+2018      puppimet  data    316998   319313   2018B      0.00434261   0.00892927  0.00234695    0.20381
+2018      puppimet  data    319313   320394   2018C      0.00198311   0.37026     -0.016127     0.402029
+2018      puppimet  data    320394   325274   2018D      0.00220647   0.378141    -0.0160244    0.471053
+
+2018      puppimet  mc      -        -        -          -0.0214557   0.969428    0.0167134     0.199296
+"""
+
+columns = ["era", "met", "sample", "run_min", "run_max", "period", "x_slope", "x_offset", "y_slope", "y_offset"]
+
+eras = ["2016pre", "2016post", "2017", "2018"]
+
+
+def read_table(text=table):
+    """the rows of the table as dicts, '-' is None"""
+    rows = []
+    for line in text.splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        values = [None if value == "-" else value for value in line.split()]
+        if len(values) != len(columns):
+            raise ValueError("wrong number of columns in parameter table: {}".format(line))
+        row = dict(zip(columns, values))
+        for column in ["run_min", "run_max"]:
+            row[column] = None if row[column] is None else int(row[column])
+        row["parameters"] = None if row["x_slope"] is None else [float(row[c]) for c in columns[6:]]
+        rows.append(row)
+    return rows
+
+
+rows = read_table()
+
+
+def parameter_rows(era, met, sample):
+    """the parameters [x_slope, x_offset, y_slope, y_offset] (None: no correction) and the run edges (None for MC)"""
+    selected = [row for row in rows if (row["era"], row["met"], row["sample"]) == (era, met, sample)]
+    if not selected:
+        raise KeyError("no MET phi correction parameters for {} {} {}".format(era, met, sample))
+    if sample == "mc":
+        if len(selected) != 1:
+            raise ValueError("{} rows for {} {} mc".format(len(selected), era, met))
+        return [selected[0]["parameters"]], None
+    edges = [selected[0]["run_min"]]
+    for row in selected:
+        if row["run_min"] != edges[-1]:
+            raise ValueError("run bins of {} {} data are not contiguous at run {}".format(era, met, row["run_min"]))
+        edges.append(row["run_max"])
+    return [row["parameters"] for row in selected], edges
+
+
+def corrections(era, met, sample):
+    """the FormulaRefs of the pt/phi corrections (one per run bin for data) and the run edges (None for MC)"""
+    import correctionlib.schemav2 as cs
+
+    parameters, edges = parameter_rows(era, met, sample)
+    # formula 0: corrected pt/phi, formula 1: uncorrected pt/phi
+    formularefs = [
+        cs.FormulaRef(nodetype="formularef", index=1, parameters=[1.0])
+        if params is None
+        else cs.FormulaRef(nodetype="formularef", index=0, parameters=params)
+        for params in parameters
+    ]
+    return formularefs, edges
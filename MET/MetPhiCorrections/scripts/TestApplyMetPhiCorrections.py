@@ -0,0 +1,127 @@
+import os
+import sys
+import tempfile
+import numpy as np
+import ApplyMetPhiCorrections as apply
+from MetPhiCorrections_Corrector import MetPhiCorrector
+
+# checks ApplyMetPhiCorrections.py with .npz files (Parquet and Feather need pyarrow and are checked if it is installed)
+#     python TestApplyMetPhiCorrections.py
+# - the corrected columns written chunk by chunk are the same as the ones of MetPhiCorrector on the whole arrays
+# - a reader that fails in the middle of the file leaves no output file (and no temporary files)
+
+rng = np.random.default_rng(42)
+
+corrections = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "corrections", "met_2018_UL.json.gz")
+
+nevents = 2500
+
+
+def random_events(corrector):
+    events = {
+        "MET_pt": rng.uniform(0.0, 1000.0, nevents),
+        "MET_phi": rng.uniform(-3.14, 3.14, nevents),
+        "PV_npvs": rng.integers(0, 100, nevents).astype(float),
+        "event": np.arange(nevents, dtype=np.int64),
+    }
+    if corrector.edges is not None:
+        events["run"] = rng.integers(corrector.edges[0], corrector.edges[-1], nevents).astype(float)
+    return events
+
+
+def read_output(path):
+    if apply.file_format(path) == "npz":
+        with np.load(path) as archive:
+            return {name: archive[name] for name in archive.files}
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path) if apply.file_format(path) == "parquet" else pa.ipc.open_file(path).read_all()
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def write_input(path, events):
+    if apply.file_format(path) == "npz":
+        np.savez_compressed(path, **events)
+        return
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.table(events)
+    if apply.file_format(path) == "parquet":
+        pq.write_table(table, path, row_group_size=1000)
+    else:
+        with pa.ipc.new_file(path, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=1000):
+                writer.write_batch(batch)
+
+
+columns = {"met_pt": "MET_pt", "met_phi": "MET_phi", "npvs": "PV_npvs"}
+
+
+def check_round_trip(directory, label, extension):
+    corrector = MetPhiCorrector.from_json(corrections, label)
+    events = random_events(corrector)
+    infile = os.path.join(directory, "events" + extension)
+    outfile = os.path.join(directory, "corrected" + extension)
+    write_input(infile, events)
+    # a chunk size that does not divide the number of events
+    count = apply.apply_correction(corrector, infile, outfile, 700, columns, ["event"])
+    result = read_output(outfile)
+    pt, phi = corrector(events["MET_pt"], events["MET_phi"], events["PV_npvs"], events.get("run"))
+    ok = (
+        count == nevents
+        and sorted(result) == ["corrmet_phi", "corrmet_pt", "event"]
+        and np.array_equal(result["corrmet_pt"], pt)
+        and np.array_equal(result["corrmet_phi"], phi)
+        and np.array_equal(result["event"], events["event"])
+    )
+    print("{:8s} round trip {} {}".format("ok" if ok else "FAILED", label, extension))
+    return ok
+
+
+class FailingSource(apply.NpzSource):
+    """reads the first two chunks and then fails"""
+
+    def chunks(self, chunk_size):
+        for i, chunk in enumerate(super().chunks(chunk_size)):
+            if i == 2:
+                raise OSError("read error")
+            yield chunk
+
+
+def check_failure(directory, extension):
+    corrector = MetPhiCorrector.from_json(corrections, "metphicorr_pfmet_mc")
+    infile = os.path.join(directory, "failing.npz")
+    outfile = os.path.join(directory, "failed" + extension)
+    np.savez(infile, **random_events(corrector))
+    sources = dict(apply.sources)
+    apply.sources["npz"] = FailingSource
+    try:
+        apply.apply_correction(corrector, infile, outfile, 500, columns)
+        raised = False
+    except OSError:
+        raised = True
+    finally:
+        apply.sources.update(sources)
+    leftovers = [name for name in os.listdir(directory) if name.startswith("failed") or name.startswith(".npz-")]
+    ok = raised and not leftovers
+    print("{:8s} failure in the middle {} {}".format("ok" if ok else "FAILED", extension, leftovers))
+    return ok
+
+
+if __name__ == "__main__":
+    extensions = [".npz"]
+    try:
+        import pyarrow
+        extensions += [".parquet", ".feather"]
+    except ImportError:
+        print("pyarrow is not installed, only .npz is checked")
+    ok = True
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in extensions:
+            for label in ["metphicorr_pfmet_data", "metphicorr_puppimet_mc"]:
+                ok &= check_round_trip(directory, label, extension)
+            ok &= check_failure(directory, extension)
+    print("ApplyMetPhiCorrections {}".format("works" if ok else "DOES NOT WORK"))
+    sys.exit(0 if ok else 1)
@@ -1,75 +1,215 @@
-import sys
+import argparse
+import gzip
+import json
+import resource
+import time
+import tracemalloc
 import correctionlib
 import numpy as np
-import matplotlib.pyplot as plt
+from MetPhiCorrections_Corrector import MetPhiCorrector
 
-rng = np.random.default_rng()
-
-correction_label = sys.argv[1]
-infile = sys.argv[2]
-
-is_data = None
-
-if ("mc" in correction_label) and (not ("data" in correction_label)):
-    is_data = False
-elif ("data" in correction_label) and (not ("mc" in correction_label)):
-    is_data = True
-else:
-    print("first argument needs to contain either 'mc' or 'data'")
-    exit()
-
-ceval = correctionlib.CorrectionSet.from_file(infile)
-
-print(list(ceval.keys()))
-print(list(ceval.values()))
-
-for corr in ceval.values():
-    print(f"Correction {corr.name}")
-    print(f"Version {corr.version}")
-
-pts = rng.uniform(low=0.0, high=1000.0, size=1000000)
-phis = rng.uniform(low=-3.14, high=3.14, size=1000000)
-npvs = rng.integers(low=0, high=200, size=1000000)
-runs = None
-if is_data:
-    runs = rng.integers(low=272007, high=325274, size=1000000)
-else:
-    runs = rng.integers(low=0, high=100000, size=1000000)
-
-print("uncorrected pts:", pts[1:11])
-print("uncorrected phis:", phis[1:11])
-print("number of vertices:", npvs[1:11])
-print("run numbers:", runs[1:11])
+# technical test of a MET phi correction json
+#     python TestMetPhiCorrections.py metphicorr_pfmet_mc metphicorr_pfmet_mc_2018_ul.json.gz [--plot]
+# and benchmark of the pt and phi corrections of one or more jsons for a sweep of event counts
+#     python TestMetPhiCorrections.py --benchmark ../corrections/met_*_UL.json.gz [--events 1000 10000 100000 1000000]
+# the corrected values and histograms of the test are computed with MetPhiCorrector from the parameters of the json
+# (the vectorized evaluation of formulas in correctionlib 2.3 returns the value of the first event for all events), the
+# first events are compared with correctionlib evaluated event by event. The benchmark times MetPhiCorrector, the
+# vectorized correctionlib calls are only timed as a reference, their values are not used.
 
-corrected_pts = ceval["pt_{}".format(correction_label)].evaluate(pts, phis, npvs, runs)
-corrected_phis = ceval["phi_{}".format(correction_label)].evaluate(pts, phis, npvs, runs)
-
-print("corrected pts:", corrected_pts[1:11])
-print("corrected phis:", corrected_phis[1:11])
-
-fig, axs = plt.subplots(1, 2, sharey=True, tight_layout=True)
-axs[0].set(xlabel="uncorrected phi")
-axs[0].hist(phis, bins=32)
-axs[1].set(xlabel="corrected phi")
-axs[1].hist(corrected_phis, bins=32)
-
-# plt.show()
-plt.savefig("{}_1D.pdf".format(correction_label))
-print("{}_1D.pdf saved".format(correction_label))
-
-fig, axs = plt.subplots(1, 2, tight_layout=True, sharey=True)
-
-axs[0].hist2d(npvs, phis, bins=(20, 16))
-axs[0].set(xlabel="number of primary vertices", ylabel="uncorrected phi")
-axs[1].hist2d(npvs, corrected_phis, bins=(20, 16))
-axs[1].set(xlabel="number of primary vertices", ylabel="corrected phi")
-
-# plt.show()
-plt.savefig("{}_2D.pdf".format(correction_label))
-print("{}_2D.pdf saved".format(correction_label))
-
-# fig, ax = plt.subplots(tight_layout=True)
+rng = np.random.default_rng()
 
-# ax.hist2d(phis, corrected_phis, bins=(32,32))
 
-# plt.show()
+def random_events(n, is_data, run_range=None):
+    pts = rng.uniform(low=0.0, high=1000.0, size=n)
+    phis = rng.uniform(low=-3.14, high=3.14, size=n)
+    npvs = rng.integers(low=0, high=200, size=n)
+    if is_data:
+        low, high = run_range or (272007, 325274)
+        runs = rng.integers(low=low, high=high, size=n)
+    else:
+        runs = rng.integers(low=0, high=100000, size=n)
+    return pts, phis, npvs, runs
+
+
+def evaluate_each(correction, *arrays):
+    """evaluates a correction event by event"""
+    return np.array([correction.evaluate(*values) for values in zip(*[array.tolist() for array in arrays])])
+
+
+def is_data_label(correction_label):
+    if ("mc" in correction_label) and (not ("data" in correction_label)):
+        return False
+    elif ("data" in correction_label) and (not ("mc" in correction_label)):
+        return True
+    return None
+
+
+def run_range(node):
+    """first and last edge of the corrected run bins of a correction (the first bin has no correction)"""
+    if isinstance(node, dict):
+        if node.get("nodetype") == "binning" and node.get("input") == "run":
+            return int(node["edges"][1]), int(node["edges"][-1])
+        nodes = node.values()
+    elif isinstance(node, list):
+        nodes = node
+    else:
+        return None
+    for value in nodes:
+        found = run_range(value)
+        if found is not None:
+            return found
+    return None
+
+
+def histograms(correction_label, phis, npvs, corrected_phis):
+    """phi and npvs vs phi histograms before and after the correction, saved to CORRECTION_LABEL_hists.npz"""
+    phi_edges = np.linspace(-3.15, 3.15, 33)
+    uncorrected, _ = np.histogram(phis, bins=phi_edges)
+    corrected, _ = np.histogram(corrected_phis, bins=phi_edges)
+    uncorrected_2d, npvs_edges, phi_edges_2d = np.histogram2d(npvs, phis, bins=(20, 16))
+    corrected_2d, _, _ = np.histogram2d(npvs, corrected_phis, bins=(npvs_edges, phi_edges_2d))
+    np.savez(
+        "{}_hists.npz".format(correction_label),
+        phi_edges=phi_edges,
+        uncorrected_phi=uncorrected,
+        corrected_phi=corrected,
+        npvs_edges=npvs_edges,
+        phi_edges_2d=phi_edges_2d,
+        uncorrected_npvs_phi=uncorrected_2d,
+        corrected_npvs_phi=corrected_2d,
+    )
+    print("{:>16s} {:>12s} {:>12s}".format("phi", "uncorrected", "corrected"))
+    for i in range(len(uncorrected)):
+        print("[{:6.3f},{:6.3f}) {:12d} {:12d}".format(phi_edges[i], phi_edges[i + 1], uncorrected[i], corrected[i]))
+    print("{}_hists.npz saved".format(correction_label))
+
+
+def test(correction_label, infile, nevents, plot):
+    is_data = is_data_label(correction_label)
+    if is_data is None:
+        print("first argument needs to contain either 'mc' or 'data'")
+        exit()
+
+    ceval = correctionlib.CorrectionSet.from_file(infile)
+
+    print(list(ceval.keys()))
+    print(list(ceval.values()))
+
+    for corr in ceval.values():
+        print(f"Correction {corr.name}")
+        print(f"Version {corr.version}")
+
+    with gzip.open(infile, "rt") if infile.endswith(".gz") else open(infile) as f:
+        corrections = {correction["name"]: correction for correction in json.load(f)["corrections"]}
+    corrector = MetPhiCorrector.from_json(infile, correction_label)
+    pts, phis, npvs, runs = random_events(
+        nevents, is_data, run_range(corrections["pt_{}".format(correction_label)]["data"]) if is_data else None
+    )
+
+    print("uncorrected pts:", pts[1:11])
+    print("uncorrected phis:", phis[1:11])
+    print("number of vertices:", npvs[1:11])
+    print("run numbers:", runs[1:11])
+
+    corrected_pts, corrected_phis = corrector(pts, phis, npvs, runs if is_data else None)
+
+    print("corrected pts:", corrected_pts[1:11])
+    print("corrected phis:", corrected_phis[1:11])
+
+    # cross-check with the json, event by event
+    sample = [array[:1000].astype(float) for array in [pts, phis, npvs, runs]]
+    json_pts = evaluate_each(ceval["pt_{}".format(correction_label)], *sample)
+    json_phis = evaluate_each(ceval["phi_{}".format(correction_label)], *sample)
+    same = np.allclose(corrected_pts[:1000], json_pts, rtol=1e-12, atol=1e-9) and np.allclose(
+        corrected_phis[:1000], json_phis, rtol=1e-12, atol=1e-12
+    )
+    print("first {} events {} the json evaluated event by event".format(len(json_pts), "agree with" if same else "DIFFER from"))
+
+    if plot:
+        histograms(correction_label, phis, npvs, corrected_phis)
+
+
+def best_time(function, repeat):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def peak_memory(function):
+    """peak of the memory allocated through python/numpy while calling function, in MB"""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(infiles, event_counts, repeat):
+    """events/s and peak memory of MetPhiCorrector (corrected pt and phi together) for every pt_/phi_ correction pair
+    of the jsons, and as a reference the events/s of the vectorized correctionlib pt and phi calls"""
+    print(
+        "{:40s} {:30s} {:>9s} {:>16s} {:>10s} {:>18s}".format(
+            "file", "correction", "events", "corrector [ev/s]", "peak [MB]", "ref: json [ev/s]"
+        )
+    )
+    for infile in infiles:
+        with gzip.open(infile, "rt") if infile.endswith(".gz") else open(infile) as f:
+            corrections = {correction["name"]: correction for correction in json.load(f)["corrections"]}
+        ceval = correctionlib.CorrectionSet.from_file(infile)
+        labels = [name[3:] for name in corrections if name.startswith("pt_") and "phi_" + name[3:] in corrections]
+        for label in labels:
+            corrector = MetPhiCorrector.from_json(infile, label)
+            pt_correction = ceval["pt_" + label]
+            phi_correction = ceval["phi_" + label]
+            is_data = bool(is_data_label(label))
+            runs = run_range(corrections["pt_" + label]["data"]) if is_data else None
+            for n in event_counts:
+                pts, phis, npvs, runs_ = random_events(n, is_data, runs)
+                correct = lambda: corrector(pts, phis, npvs, runs_ if is_data else None)
+                corrector_time = best_time(correct, repeat)
+                peak = peak_memory(correct)
+                json_time = best_time(
+                    lambda: (
+                        pt_correction.evaluate(pts, phis, npvs, runs_),
+                        phi_correction.evaluate(pts, phis, npvs, runs_),
+                    ),
+                    repeat,
+                )
+                print(
+                    "{:40s} {:30s} {:9d} {:16.3g} {:10.1f} {:18.3g}".format(
+                        infile.split("/")[-1], label, n, n / corrector_time, peak, n / json_time
+                    )
+                )
+    print("ref: vectorized correctionlib pt and phi calls, only for comparison (correctionlib 2.3 returns the value of the first event for all events)")
+    # ru_maxrss is in kB on linux
+    print("peak resident memory of the process: {:.1f} MB".format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="test or benchmark MET phi correction jsons")
+    parser.add_argument("correction_label", nargs="?", help="correction to test, e.g. metphicorr_pfmet_mc")
+    parser.add_argument("infile", nargs="?", help="json with the correction")
+    parser.add_argument("-n", "--nevents", type=int, default=1000000, help="number of test events (default: 1000000)")
+    parser.add_argument("--plot", action="store_true", help="save phi and npvs vs phi histograms (NumPy) of the test")
+    parser.add_argument("--benchmark", nargs="+", metavar="JSON", help="benchmark the corrections of these jsons")
+    parser.add_argument(
+        "--events",
+        nargs="+",
+        type=int,
+        default=[1000, 10000, 100000, 1000000],
+        help="event counts of the benchmark (default: 1000 10000 100000 1000000)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions, the best is reported (default: 3)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.events, args.repeat)
+    elif args.infile is None:
+        parser.error("give the correction label and the json, or --benchmark JSON [JSON ...]")
+    else:
+        test(args.correction_label, args.infile, args.nevents, args.plot)
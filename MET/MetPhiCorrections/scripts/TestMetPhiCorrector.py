@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import correctionlib
+import numpy as np
+from MetPhiCorrections_Corrector import MetPhiCorrector
+from TestMetPhiFormula import evaluate_each
+
+# compares MetPhiCorrector with the pt_*/phi_* corrections of the jsons in ../corrections and times both
+#     python TestMetPhiCorrector.py [number of events]
+# the jsons are evaluated event by event for the comparison (the vectorized evaluation of formulas in correctionlib 2.3
+# returns the value of the first event for all events), the vectorized calls are only used for the timing
+
+rng = np.random.default_rng(42)
+
+nevents = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+corrections_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "corrections")
+
+labels = ["pfmet_data", "pfmet_mc", "puppimet_data", "puppimet_mc"]
+eras = ["2016pre", "2016post", "2017", "2018"]
+
+
+def random_events(n, edges):
+    pts = rng.uniform(0.0, 1000.0, n)
+    phis = rng.uniform(-3.14, 3.14, n)
+    npvs = rng.integers(0, 200, n).astype(float)
+    if edges is None:
+        runs = rng.integers(0, 100000, n).astype(float)
+    else:
+        # half of the events in the runs with corrections, the other half anywhere
+        runs = np.concatenate(
+            [
+                rng.integers(edges[1], edges[-1], n // 2),
+                rng.integers(edges[0], edges[-1], n - n // 2),
+            ]
+        ).astype(float)
+    return pts, phis, npvs, runs
+
+
+ok = True
+print("{:45s} {:>12s} {:>12s} {:>12s} {:>12s}".format("file", "max |dpt|", "max |dphi|", "json", "corrector"))
+for label in labels:
+    for era in eras:
+        path = os.path.join(corrections_dir, "metphicorr_{}_{}_ul.json.gz".format(label, era))
+        corrector = MetPhiCorrector.from_json(path, "metphicorr_" + label)
+        from_table = MetPhiCorrector.from_table(era, *label.split("_"))
+        if not (
+            np.array_equal(corrector.parameters, from_table.parameters, equal_nan=True)
+            and np.array_equal(corrector.edges, from_table.edges)
+        ):
+            print("parameters in {} differ from the parameter table".format(path))
+            ok = False
+
+        ceval = correctionlib.CorrectionSet.from_file(path)
+        pts, phis, npvs, runs = random_events(nevents, corrector.edges)
+
+        start = time.perf_counter()
+        ceval["pt_metphicorr_" + label].evaluate(pts, phis, npvs, runs)
+        ceval["phi_metphicorr_" + label].evaluate(pts, phis, npvs, runs)
+        json_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        corrected_pt, corrected_phi = corrector(pts, phis, npvs, runs)
+        corrector_time = time.perf_counter() - start
+
+        # integer npvs use the offset table, non-integer ones the direct computation
+        dpt, dphi = 0.0, 0.0
+        for shift in [0.0, 0.5]:
+            sample = [pts[:10000], phis[:10000], npvs[:10000] + shift, runs[:10000]]
+            json_pt = evaluate_each(ceval["pt_metphicorr_" + label], *sample)
+            json_phi = evaluate_each(ceval["phi_metphicorr_" + label], *sample)
+            corrected_pt, corrected_phi = corrector(*sample)
+            dpt = max(dpt, np.max(np.abs(corrected_pt - json_pt)))
+            dphi = max(dphi, np.max(np.abs(corrected_phi - json_phi)))
+            if not (
+                np.allclose(corrected_pt, json_pt, rtol=1e-12, atol=1e-9)
+                and np.allclose(corrected_phi, json_phi, rtol=1e-12, atol=1e-12)
+            ):
+                ok = False
+        print(
+            "{:45s} {:12.3g} {:12.3g} {:10.1f}ms {:10.1f}ms".format(
+                os.path.basename(path), dpt, dphi, 1000 * json_time, 1000 * corrector_time
+            )
+        )
+
+print("MetPhiCorrector {} the jsons".format("agrees with" if ok else "DOES NOT AGREE with"))
+sys.exit(0 if ok else 1)
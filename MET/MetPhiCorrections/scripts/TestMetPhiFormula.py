@@ -0,0 +1,157 @@
+import glob
+import gzip
+import json
+import os
+import sys
+import time
+import correctionlib
+import correctionlib.schemav2 as cs
+import numpy as np
+from MetPhiCorrections_Utility import MetPhiCorrectionsHelper as helper
+import MetPhiCorrections_parameters_ul as parameter_table
+
+# checks that the compact phi formula of MetPhiCorrectionsHelper gives the same values as the legacy one and compares
+# their speed on the jsons in ../corrections
+#     python TestMetPhiFormula.py [number of events]
+# the values are compared event by event: the vectorized evaluation of formulas in correctionlib 2.3 returns the value
+# of the first event for all events, only its timing is used
+
+rng = np.random.default_rng(42)
+
+nevents = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+corrections_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "corrections")
+
+def formula_evaluator(expression, parameters):
+    """correctionlib evaluator of a phi/pt formula with fixed parameters"""
+    correction = cs.Correction(
+        name="formula",
+        version=1,
+        inputs=[
+            cs.Variable(name="met_pt", type="real"),
+            cs.Variable(name="met_phi", type="real"),
+            cs.Variable(name="npvs", type="real"),
+        ],
+        output=cs.Variable(name="value", type="real"),
+        data=cs.Formula(
+            nodetype="formula",
+            variables=["met_pt", "met_phi", "npvs"],
+            parser="TFormula",
+            expression=expression,
+            parameters=list(parameters),
+        ),
+    )
+    return correction.to_evaluator()
+
+
+def evaluate_each(correction, *arrays):
+    """evaluates a correction event by event"""
+    return np.array([correction.evaluate(*values) for values in zip(*[array.tolist() for array in arrays])])
+
+
+def test_points(parameters, n):
+    """random points in the binning of the jsons plus the edge cases of the formula"""
+    pts = rng.uniform(0.0, helper.pt_max, n)
+    phis = rng.uniform(-helper.phi_max, helper.phi_max, n)
+    npvs = rng.integers(0, 200, n).astype(float)
+    # phi on the axes and exactly zero pt
+    special_phis = np.array([0.0, np.pi / 2, -np.pi / 2, np.pi, -np.pi, helper.phi_max, -helper.phi_max])
+    special_npvs = np.arange(0.0, 200.0, 10.0)
+    grid = np.array(np.meshgrid([0.0, 1.0, 20.0, 100.0], special_phis, special_npvs)).reshape(3, -1)
+    # corrected x component exactly zero: phi=0 and pt equal to the x correction ([0]*npvs+[1])
+    npvs_zero = special_npvs[parameters[0] * special_npvs + parameters[1] >= 0.0]
+    pts_zero = parameters[0] * npvs_zero + parameters[1]
+    return (
+        np.concatenate([pts, grid[0], pts_zero]),
+        np.concatenate([phis, grid[1], np.zeros(len(npvs_zero))]),
+        np.concatenate([npvs, grid[2], npvs_zero]),
+    )
+
+
+def test_equivalence(n=20000):
+    """the compact and the legacy phi formula have to agree bit by bit for all parameters of all eras"""
+    ok = True
+    for met, sample, era in sorted(set((row["met"], row["sample"], row["era"]) for row in parameter_table.rows)):
+        rows, edges = parameter_table.parameter_rows(era, met, sample)
+        parameters = [params for params in rows if params is not None]
+        for params in parameters:
+            pts, phis, npvs = test_points(params, n)
+            compact = evaluate_each(formula_evaluator(helper.phi_calculation, params), pts, phis, npvs)
+            legacy = evaluate_each(formula_evaluator(helper.phi_calculation_legacy, params), pts, phis, npvs)
+            if not np.array_equal(compact, legacy, equal_nan=True):
+                ok = False
+                differ = ~((compact == legacy) | (np.isnan(compact) & np.isnan(legacy)))
+                print(
+                    "{} {} {} parameters {}: {} values differ, e.g. pt={} phi={} npvs={}: {} != {}".format(
+                        met, sample, era, params, differ.sum(),
+                        pts[differ][0], phis[differ][0], npvs[differ][0], compact[differ][0], legacy[differ][0],
+                    )
+                )
+        print("{:8s} {:4s} {:8s} {} parameter sets checked".format(met, sample, era, len(parameters)))
+    print("compact phi formula is {}equivalent to the legacy one".format("" if ok else "NOT "))
+    return ok
+
+
+def run_binning(node):
+    """edges of the run binning of a correction (None for simulation)"""
+    if isinstance(node, dict):
+        if node.get("nodetype") == "binning" and node.get("input") == "run":
+            return node["edges"]
+        for value in node.values():
+            edges = run_binning(value)
+            if edges is not None:
+                return edges
+    elif isinstance(node, list):
+        for value in node:
+            edges = run_binning(value)
+            if edges is not None:
+                return edges
+    return None
+
+
+def best_time(function, repeat=3):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark(n):
+    """evaluation time of the phi corrections of every json with the legacy and the compact formula"""
+    print("\n{:45s} {:32s} {:>10s} {:>10s} {:>8s}".format("file", "correction", "legacy", "compact", "speedup"))
+    for path in sorted(glob.glob(os.path.join(corrections_dir, "*.json.gz"))):
+        with gzip.open(path, "rt") as f:
+            text = f.read()
+        # the same json with either formula
+        legacy_text = text.replace(json.dumps(helper.phi_calculation), json.dumps(helper.phi_calculation_legacy))
+        compact_text = text.replace(json.dumps(helper.phi_calculation_legacy), json.dumps(helper.phi_calculation))
+        legacy_cset = correctionlib.CorrectionSet.from_string(legacy_text)
+        compact_cset = correctionlib.CorrectionSet.from_string(compact_text)
+        for correction in json.loads(text)["corrections"]:
+            if not correction["name"].startswith("phi_"):
+                continue
+            pts = rng.uniform(0.0, 1000.0, n)
+            phis = rng.uniform(-3.14, 3.14, n)
+            npvs = rng.integers(0, 200, n).astype(float)
+            edges = run_binning(correction["data"])
+            runs = rng.uniform(edges[1], edges[-1], n).astype(int).astype(float) if edges else np.zeros(n)
+            legacy = legacy_cset[correction["name"]]
+            compact = compact_cset[correction["name"]]
+            legacy_time = best_time(lambda: legacy.evaluate(pts, phis, npvs, runs))
+            compact_time = best_time(lambda: compact.evaluate(pts, phis, npvs, runs))
+            sample = [array[:10000] for array in [pts, phis, npvs, runs]]
+            same = np.array_equal(evaluate_each(legacy, *sample), evaluate_each(compact, *sample), equal_nan=True)
+            print(
+                "{:45s} {:32s} {:8.1f}ms {:8.1f}ms {:7.2f}x{}".format(
+                    os.path.basename(path), correction["name"], 1000 * legacy_time, 1000 * compact_time,
+                    legacy_time / compact_time, "" if same else "  DIFFERENT VALUES",
+                )
+            )
+
+
+if __name__ == "__main__":
+    ok = test_equivalence()
+    benchmark(nevents)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,673 @@
+"""
+build driver for the JMAR and MET correction jsons
+
+every builder script declares its build targets in a module level list
+    targets = [{"args": [...], "outputs": [...], "inputs": [...]}, ...]
+where "args" are the arguments of the create_corr function of the script, "outputs" the files it writes and
+"inputs" the data files it reads (both relative to the directory of the script).
+The targets are found by parsing the scripts, without importing them.
+
+builds are incremental: for every target a fingerprint of its inputs, of the builder script and of all local modules
+it imports (helper functions, parameter modules, ...) is stored in .jsonformat-state.json together with the hashes
+of its outputs. A target is only rebuilt if the fingerprint changed or an output is missing or was modified.
+
+the merged JMAR jsons (*_jmar.json[.gz]) are defined in 'bundles' below (the MET ones are written by their builder).
+create_corr returns the CorrectionSet it wrote, a bundle is assembled from these objects when its parts are built,
+without reading the part files again. A bundle is rebuilt (together with its parts) if one of its parts changed.
+next to every bundle an index (BUNDLE.index.json) with the byte range and sha256 of every correction is written, in gzip
+compressed bundles every correction is a separate gzip member, so single corrections can be read without the rest
+(see LazyCorrectionSet in JMAR/sfeval.py).
+
+    python jsonformat.py list [PATTERN ...]
+    python jsonformat.py build [-j JOBS] [--force] [--dry-run] [PATTERN ...]
+    python jsonformat.py validate [--schema] [FILE|PATTERN ...]
+    python jsonformat.py eval FILE CORRECTION [VALUE ...]
+
+PATTERN selects targets whose name (e.g. JMAR/DeepAK8/deepak8_corrections:Top,2016) contains it or matches it as glob,
+and bundles whose output (e.g. JMAR/UL17_jmar.json.gz) does; the parts of a selected bundle are always selected.
+
+the heavy modules are only imported by the subcommands that need them: 'list' only parses the scripts, 'validate' and
+'eval' only load correctionlib, the builders (with pandas, numpy, ROOT/uproot) are only imported by 'build'.
+"""
+
+import argparse
+import ast
+import contextlib
+import fnmatch
+import gzip
+import hashlib
+import importlib.util
+import io
+import itertools
+import json
+import os
+import sys
+import time
+import traceback
+
+topdir = os.path.dirname(os.path.abspath(__file__))
+
+# directories (relative to topdir) that contain builder scripts
+builddirs = ["JMAR", "MET"]
+
+# merged jsons: output (relative to topdir), names of the targets whose corrections are merged (in this order)
+# and the json format of 'correction merge' they are written with
+bundles = [
+    {
+        "output": "JMAR/{}_jmar.json".format(year),
+        "parts": [
+            "JMAR/DeepAK8/deepak8_corrections:Top,{}".format(year),
+            "JMAR/DeepAK8/deepak8_corrections:W,{}".format(year),
+            "JMAR/Toptagging/EOY/toptagging_corrections:{}".format(year),
+            "JMAR/QuarkGluon/quarkgluon_corrections:{}".format(year),
+            "JMAR/Wtagging/softdrop_corrections:{}".format(year),
+            "JMAR/Wtagging/wtagging_corrections:{}".format(year),
+            "JMAR/PUJetID/EOY/pujetid_corrections:{}".format(year),
+        ],
+        "format": "compact",
+    }
+    for year in ["2016", "2017", "2018"]
+] + [
+    {"output": "JMAR/UL16postVFP_jmar.json.gz", "parts": ["JMAR/PUJetID/pujetid_corrections:UL2016_"], "format": "compact"},
+    {"output": "JMAR/UL16preVFP_jmar.json.gz", "parts": ["JMAR/PUJetID/pujetid_corrections:UL2016APV"], "format": "compact"},
+] + [
+    {
+        "output": "JMAR/UL{}_jmar.json.gz".format(year),
+        "parts": [
+            "JMAR/Toptagging/toptagging_corrections:UL{}".format(year),
+            "JMAR/PUJetID/pujetid_corrections:UL20{}".format(year),
+        ],
+        "format": "compact",
+    }
+    for year in ["17", "18"]
+]
+
+# fingerprints and output hashes of the last successful builds
+statefile = os.path.join(topdir, ".jsonformat-state.json")
+
+# version of the bundle indices (BUNDLE.index.json), see write_bundle and LazyCorrectionSet in JMAR/sfeval.py
+index_version = 2
+
+# environment variables that change the output of the builders (part of the fingerprints if they are set)
+option_variables = ["JMAR_INTCATEGORIES", "JMAR_TABULATE"]
+
+
+class Target:
+    """one create_corr call of a builder script"""
+
+    def __init__(self, script, args, outputs, inputs=()):
+        self.script = script
+        self.args = list(args)
+        self.outputs = list(outputs)
+        self.inputs = list(inputs)
+
+    @property
+    def name(self):
+        return os.path.splitext(os.path.relpath(self.script, topdir))[0] + ":" + ",".join(str(a) for a in self.args)
+
+    @property
+    def workdir(self):
+        return os.path.dirname(self.script)
+
+    def output_paths(self):
+        return [os.path.join(self.workdir, output) for output in self.outputs]
+
+    def input_paths(self):
+        return [os.path.join(self.workdir, path) for path in self.inputs]
+
+
+class Bundle:
+    """a merged json written from the CorrectionSets of its parts"""
+
+    def __init__(self, output, parts, format="compact"):
+        self.output = os.path.join(topdir, output)
+        self.parts = list(parts)
+        self.format = format
+
+    @property
+    def name(self):
+        return os.path.relpath(self.output, topdir)
+
+
+def read_targets(script):
+    """returns the targets declared in a script (literal module level 'targets' list)"""
+    with open(script) as f:
+        source = f.read()
+    if "targets" not in source:
+        return []
+    for node in ast.parse(source, script).body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "targets" for t in node.targets):
+            return [
+                Target(script, t["args"], t.get("outputs", []), t.get("inputs", []))
+                for t in ast.literal_eval(node.value)
+            ]
+    return []
+
+
+def matches(name, patterns):
+    return any(p in name or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def find_targets(patterns=()):
+    """all targets and bundles, optionally only the ones matching one of the patterns (and the parts of the bundles)"""
+    targets = []
+    for builddir in builddirs:
+        for root, dirs, files in os.walk(os.path.join(topdir, builddir)):
+            dirs[:] = sorted(d for d in dirs if not d.startswith((".", "__")))
+            for filename in sorted(files):
+                if filename.endswith(".py"):
+                    targets += read_targets(os.path.join(root, filename))
+    selected = [Bundle(**bundle) for bundle in bundles]
+    if patterns:
+        selected = [bundle for bundle in selected if matches(bundle.name, patterns)]
+        parts = set(part for bundle in selected for part in bundle.parts)
+        targets = [t for t in targets if t.name in parts or matches(t.name, patterns)]
+    names = set(t.name for t in targets)
+    for bundle in selected:
+        for part in bundle.parts:
+            if part not in names:
+                raise ValueError("unknown part {} of bundle {}".format(part, bundle.name))
+    return targets, selected
+
+
+# content hashes of the files read in this process
+hashes = {}
+
+
+def file_hash(path):
+    if path not in hashes:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        hashes[path] = sha.hexdigest()
+    return hashes[path]
+
+
+def local_imports(script, found=None):
+    """the script and all modules of the repository it imports (directly or through other local modules)
+
+    an imported module is looked up in the directory of the importing file and in its parent directories (up to topdir),
+    like the builder scripts extend sys.path. Modules that are not found there (numpy, correctionlib, ...) are ignored.
+    """
+    found = set() if found is None else found
+    if script in found:
+        return found
+    found.add(script)
+    with open(script) as f:
+        tree = ast.parse(f.read(), script)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    for name in sorted(names):
+        directory = os.path.dirname(script)
+        while True:
+            candidate = os.path.join(directory, name + ".py")
+            if os.path.isfile(candidate):
+                local_imports(candidate, found)
+                break
+            if directory == topdir or os.path.dirname(directory) == directory:
+                break
+            directory = os.path.dirname(directory)
+    return found
+
+
+def fingerprint(target):
+    """hash of the target arguments, its input files and the code that builds it"""
+    options = [[name, os.environ[name]] for name in option_variables if os.environ.get(name)]
+    sha = hashlib.sha256(json.dumps([target.name, target.args] + options).encode())
+    for path in sorted(set(target.input_paths()) | local_imports(target.script)):
+        sha.update(os.path.relpath(path, topdir).encode() + b"\0")
+        sha.update((file_hash(path) if os.path.exists(path) else "missing").encode() + b"\0")
+    return sha.hexdigest()
+
+
+def bundle_fingerprint(bundle, targets):
+    sha = hashlib.sha256(json.dumps([bundle.name, bundle.format]).encode())
+    for part in bundle.parts:
+        sha.update(fingerprint(targets[part]).encode())
+    return sha.hexdigest()
+
+
+def output_hashes(target):
+    return {os.path.relpath(path, topdir): file_hash(path) for path in target.output_paths() if os.path.exists(path)}
+
+
+def read_state():
+    if not os.path.exists(statefile):
+        return {}
+    with open(statefile) as f:
+        return json.load(f)
+
+
+def write_state(state):
+    tmp = statefile + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, statefile)
+
+
+def up_to_date(target, state):
+    """True if the target was built with the same fingerprint and its outputs are unchanged"""
+    entry = state.get(target.name)
+    if not entry or entry["fingerprint"] != fingerprint(target):
+        return False
+    return len(entry["outputs"]) == len(target.outputs) and output_hashes(target) == entry["outputs"]
+
+
+def bundle_up_to_date(bundle, targets, state):
+    entry = state.get(bundle.name)
+    if not entry or entry["fingerprint"] != bundle_fingerprint(bundle, targets):
+        return False
+    return (
+        os.path.exists(bundle.output)
+        and index_current(bundle.output)
+        and entry["outputs"] == {bundle.name: file_hash(bundle.output)}
+    )
+
+
+# builder modules already loaded in this (worker) process
+modules = {}
+
+
+def load_script(script):
+    if script not in modules:
+        workdir = os.path.dirname(script)
+        if workdir not in sys.path:
+            sys.path.insert(0, workdir)
+        modulename = "jsonformat_" + os.path.splitext(os.path.relpath(script, topdir))[0].replace(os.sep, "_")
+        spec = importlib.util.spec_from_file_location(modulename, script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        modules[script] = module
+    return modules[script]
+
+
+def run_target(target, keep=False):
+    """runs one target in the directory of its script, returns a dict with the result, the log and the outputs
+
+    with 'keep' the CorrectionSet returned by create_corr is added to the result (as "cset")
+    """
+    result = {"name": target.name, "ok": False, "error": None, "outputs": [], "cset": None}
+    log = io.StringIO()
+    cwd = os.getcwd()
+    start = time.time()
+    try:
+        os.chdir(target.workdir)
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            cset = load_script(target.script).create_corr(*target.args)
+        if keep:
+            if cset is None:
+                raise RuntimeError("create_corr does not return its CorrectionSet, needed for a bundle")
+            result["cset"] = cset
+        missing = [path for path in target.output_paths() if not os.path.exists(path)]
+        if missing:
+            raise RuntimeError("outputs not written: " + ", ".join(missing))
+        result["ok"] = True
+    except Exception:
+        result["error"] = traceback.format_exc()
+    finally:
+        os.chdir(cwd)
+    result["seconds"] = time.time() - start
+    result["log"] = log.getvalue()
+    result["outputs"] = [(path, os.path.getsize(path)) for path in target.output_paths() if os.path.exists(path)]
+    return result
+
+
+def merge_csets(csets, description):
+    """merges CorrectionSets like 'correction merge' (duplicated names are an error)"""
+    from correctionlib.schemav2 import CorrectionSet
+
+    corrections, compound = [], []
+    for cset in csets:
+        corrections += cset.corrections
+        compound += cset.compound_corrections or []
+    for names in [[c.name for c in corrections], [c.name for c in compound]]:
+        duplicates = sorted(set(name for name in names if names.count(name) > 1))
+        if duplicates:
+            raise ValueError("duplicated corrections: " + ", ".join(duplicates))
+    merged = {"schema_version": 2, "description": description, "corrections": corrections}
+    if compound:
+        merged["compound_corrections"] = compound
+    return CorrectionSet(**merged)
+
+
+def write_bundle(bundle, csets, sources):
+    """writes the merged CorrectionSet of a bundle (gzip compressed if the output ends with .gz) and its index"""
+    # the files are listed relative to the bundle if they are in its directory, otherwise only with their name
+    bundledir = os.path.dirname(bundle.output)
+    names = [
+        os.path.relpath(path, bundledir) if path.startswith(bundledir + os.sep) else os.path.basename(path)
+        for path in sources
+    ]
+    cset = merge_csets(csets, "Merged from " + " ".join(names))
+    if bundle.format == "pretty":
+        from correctionlib.JSONEncoder import dumps
+
+        text = dumps(cset) + "\n"
+    else:
+        text = cset.json()
+    data = text.encode()
+    spans = correction_spans(text)
+    if bundle.output.endswith(".gz"):
+        # one gzip member per correction, so that every correction can be decompressed on its own
+        cuts = [0] + [start for start, end in spans] + [spans[-1][1] if spans else 0, len(data)]
+        members = [gzip.compress(data[lo:hi], mtime=0) for lo, hi in zip(cuts[:-1], cuts[1:])]
+        offsets = list(itertools.accumulate([0] + [len(member) for member in members]))
+        ranges = [(offsets[i], len(members[i])) for i in range(1, 1 + len(spans))]
+        data = b"".join(members)
+    else:
+        ranges = [(start, end - start) for start, end in spans]
+    with open(bundle.output, "wb") as fout:
+        fout.write(data)
+    # the hashes of the byte ranges and of the rest of the file (frame_hash) let the reader check that the index
+    # belongs to this bundle, the size alone does not change if a value of the same width changes
+    index = {
+        "version": index_version,
+        "bundle": os.path.basename(bundle.output),
+        "size": len(data),
+        "compression": "gzip" if bundle.output.endswith(".gz") else None,
+        "schema_version": cset.schema_version,
+        "description": cset.description,
+        "frame": frame_hash(data, ranges),
+        "corrections": {
+            correction.name: [offset, length, hashlib.sha256(data[offset : offset + length]).hexdigest()]
+            for correction, (offset, length) in zip(cset.corrections, ranges)
+        },
+    }
+    with open(index_path(bundle.output), "w") as fout:
+        json.dump(index, fout, indent=1)
+
+
+def index_path(path):
+    return path + ".index.json"
+
+
+def frame_hash(data, ranges):
+    """sha256 of the bytes of a bundle before the first and after the last correction"""
+    first = ranges[0][0] if ranges else len(data)
+    last = ranges[-1][0] + ranges[-1][1] if ranges else len(data)
+    return hashlib.sha256(data[:first] + data[last:]).hexdigest()
+
+
+def index_current(path):
+    """True if the index of a bundle exists and has the current version"""
+    try:
+        with open(index_path(path)) as f:
+            return json.load(f).get("version") == index_version
+    except (OSError, ValueError):
+        return False
+
+
+def correction_spans(text):
+    """byte ranges [start, end) of the elements of the top level "corrections" array of a json text
+
+    the elements are skipped with json.JSONDecoder.raw_decode, which returns where each of them ends
+    """
+    decoder = json.JSONDecoder()
+
+    def skip(i):
+        while text[i] in " \t\r\n":
+            i += 1
+        return i
+
+    def expect(i, char):
+        i = skip(i)
+        if text[i] != char:
+            raise ValueError("expected {} at character {}".format(char, i))
+        return i + 1
+
+    spans = []
+    i = expect(0, "{")
+    while True:
+        key, i = decoder.raw_decode(text, skip(i))
+        i = skip(expect(i, ":"))
+        if key == "corrections":
+            i = expect(i, "[")
+            while text[skip(i)] != "]":
+                start = skip(i)
+                value, i = decoder.raw_decode(text, start)
+                spans.append((start, i))
+                i = skip(i)
+                if text[i] == ",":
+                    i += 1
+            i = skip(i) + 1
+        else:
+            value, i = decoder.raw_decode(text, i)
+        i = skip(i)
+        if text[i] == "}":
+            break
+        i = expect(i, ",")
+    if not text.isascii():
+        # character positions -> byte positions
+        spans = [(len(text[:start].encode()), len(text[:end].encode())) for start, end in spans]
+    return spans
+
+
+def build(targets, bundles=(), jobs=None, force=False, dry_run=False):
+    """runs the targets and assembles the bundles that are not up to date
+
+    the targets run on a pool of 'jobs' processes (default: number of cores), returns the results of the targets that
+    were run and of the bundles that were written
+    """
+    jobs = jobs or os.cpu_count() or 1
+    state = read_state()
+    bytarget = {target.name: target for target in targets}
+    bundles = [bundle for bundle in bundles if force or not bundle_up_to_date(bundle, bytarget, state)]
+    # the parts of a bundle that is rebuilt are run again to get their CorrectionSets
+    keep = set(part for bundle in bundles for part in bundle.parts)
+    if not force:
+        stale = []
+        for target in targets:
+            if target.name not in keep and up_to_date(target, state):
+                print("skip          {}".format(target.name))
+            else:
+                stale.append(target)
+        targets = stale
+    if dry_run:
+        for target in targets:
+            print("would build   {}".format(target.name))
+        for bundle in bundles:
+            print("would merge   {}".format(bundle.name))
+        return []
+    done = []
+
+    def report(result):
+        status = "ok    " if result["ok"] else "FAILED"
+        print("{} {:6.1f}s  {}".format(status, result["seconds"], result["name"]))
+        sys.stdout.flush()
+        done.append(result)
+
+    if jobs == 1 or len(targets) <= 1:
+        for target in targets:
+            report(run_target(target, target.name in keep))
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=min(jobs, len(targets))) as pool:
+            futures = [pool.submit(run_target, target, target.name in keep) for target in targets]
+            for future in as_completed(futures):
+                report(future.result())
+
+    # the outputs have been rewritten, forget the hashes of the previous ones
+    for target in targets:
+        for path in target.output_paths():
+            hashes.pop(path, None)
+    results = {result["name"]: result for result in done}
+    state = read_state()
+    for target in targets:
+        if results[target.name]["ok"]:
+            state[target.name] = {"fingerprint": fingerprint(target), "outputs": output_hashes(target)}
+        else:
+            state.pop(target.name, None)
+
+    for bundle in bundles:
+        start = time.time()
+        result = {"name": bundle.name, "ok": False, "error": None, "outputs": [], "log": ""}
+        failed = [part for part in bundle.parts if not results[part]["ok"]]
+        try:
+            if failed:
+                raise RuntimeError("parts failed: " + ", ".join(failed))
+            sources = [path for part in bundle.parts for path in bytarget[part].output_paths()]
+            write_bundle(bundle, [results[part]["cset"] for part in bundle.parts], sources)
+            hashes.pop(bundle.output, None)
+            state[bundle.name] = {
+                "fingerprint": bundle_fingerprint(bundle, bytarget),
+                "outputs": {bundle.name: file_hash(bundle.output)},
+            }
+            result["ok"] = True
+            result["outputs"] = [(bundle.output, os.path.getsize(bundle.output))]
+        except Exception:
+            result["error"] = traceback.format_exc()
+            state.pop(bundle.name, None)
+        result["seconds"] = time.time() - start
+        report(result)
+    write_state(state)
+    for result in done:
+        result.pop("cset", None)
+    return [results[target.name] for target in targets] + done[len(targets):]
+
+
+def read_json(path):
+    """the text of a (gzip compressed) json"""
+    if path.endswith(".gz"):
+        with gzip.open(path, "rt") as f:
+            return f.read()
+    with open(path) as f:
+        return f.read()
+
+
+def validate(paths, schema=False):
+    """loads every json with the correctionlib evaluator, with 'schema' also validates it against the pydantic schema
+
+    returns True if all files are valid
+    """
+    import correctionlib._core as core
+
+    if schema:
+        from correctionlib.schemav2 import CorrectionSet
+    ok = True
+    for path in paths:
+        try:
+            text = read_json(path)
+            if schema:
+                CorrectionSet.parse_raw(text)
+            cset = core.CorrectionSet.from_string(text)
+            print("ok      {}  ({} corrections)".format(os.path.relpath(path), len(list(cset))))
+        except Exception as error:
+            print("INVALID {}  {}: {}".format(os.path.relpath(path), type(error).__name__, error))
+            ok = False
+    return ok
+
+
+def evaluate(path, name, values):
+    """evaluates a correction (or compound correction) of a json for one set of input values given as strings"""
+    import correctionlib._core as core
+
+    cset = core.CorrectionSet.from_string(read_json(path))
+    corrections = cset.compound if name in cset.compound else cset
+    if name not in corrections:
+        raise KeyError("no correction {} in {}, available: {}".format(name, path, ", ".join(list(cset) + list(cset.compound))))
+    correction = corrections[name]
+    if len(values) != len(correction.inputs):
+        raise ValueError(
+            "{} needs {} inputs: {}".format(name, len(correction.inputs), ", ".join(i.name for i in correction.inputs))
+        )
+    types = {"real": float, "int": int, "string": str}
+    args = [types[variable.type](value) for variable, value in zip(correction.inputs, values)]
+    return correction.evaluate(*args)
+
+
+def print_summary(results, verbose=False):
+    failed = [r for r in results if not r["ok"]]
+    for result in results:
+        if verbose or not result["ok"]:
+            print("\n==== {} ====".format(result["name"]))
+            print(result["log"].rstrip())
+            if result["error"]:
+                print(result["error"].rstrip())
+    nbytes = sum(size for r in results for path, size in r["outputs"])
+    print(
+        "\n{} targets and bundles built, {} failed, {} files ({} bytes)".format(
+            len(results) - len(failed), len(failed), sum(len(r["outputs"]) for r in results), nbytes
+        )
+    )
+    return not failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="build driver for the JMAR and MET correction jsons")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_list = subparsers.add_parser("list", help="list the build targets and bundles")
+    parser_list.add_argument("patterns", nargs="*", help="only targets and bundles matching one of the patterns")
+
+    parser_build = subparsers.add_parser("build", help="build the targets in parallel and merge the bundles")
+    parser_build.add_argument("patterns", nargs="*", help="only targets and bundles matching one of the patterns")
+    parser_build.add_argument(
+        "-j", "--jobs", type=int, default=None, help="number of worker processes (default: number of cores)"
+    )
+    parser_build.add_argument("-v", "--verbose", action="store_true", help="print the log of every target")
+    parser_build.add_argument("-f", "--force", action="store_true", help="also rebuild the targets that are up to date")
+    parser_build.add_argument("-n", "--dry-run", action="store_true", help="only print the targets that would be built")
+
+    parser_validate = subparsers.add_parser("validate", help="check that jsons can be loaded by correctionlib")
+    parser_validate.add_argument(
+        "files", nargs="*", help="json files, or patterns selecting the outputs of targets and bundles (default: all)"
+    )
+    parser_validate.add_argument(
+        "-s", "--schema", action="store_true", help="also validate against the correctionlib schema (slower)"
+    )
+
+    parser_eval = subparsers.add_parser("eval", help="evaluate a correction for one set of inputs")
+    parser_eval.add_argument("file", help="json file")
+    parser_eval.add_argument("correction", help="name of the correction")
+    parser_eval.add_argument("values", nargs="*", help="input values, in the order of the correction inputs")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "eval":
+        try:
+            print(evaluate(args.file, args.correction, args.values))
+        except (KeyError, ValueError, RuntimeError, OSError) as error:
+            # correctionlib raises RuntimeError for inputs outside of a binning with flow 'error'
+            print("error: {}".format(error.args[0] if isinstance(error, KeyError) else error))
+            return 1
+        return 0
+
+    if args.command == "validate":
+        files = [path for path in args.files if os.path.isfile(path)]
+        patterns = [path for path in args.files if not os.path.isfile(path)]
+        if patterns or not files:
+            targets, selected = find_targets(patterns)
+            outputs = [path for target in targets for path in target.output_paths()]
+            outputs += [bundle.output for bundle in selected]
+            files += [path for path in outputs if path.endswith((".json", ".json.gz")) and os.path.exists(path)]
+        if not files:
+            print("no jsons found")
+            return 1
+        return 0 if validate(files, args.schema) else 1
+
+    targets, selected = find_targets(args.patterns)
+
+    if args.command == "list":
+        for target in targets:
+            print("{}  ->  {}".format(target.name, ", ".join(target.outputs)))
+        for bundle in selected:
+            print("{}  <-  {}".format(bundle.name, ", ".join(bundle.parts)))
+        return 0
+
+    if not targets:
+        print("no targets found")
+        return 1
+    results = build(targets, selected, args.jobs, args.force, args.dry_run)
+    if args.dry_run:
+        return 0
+    return 0 if print_summary(results, args.verbose) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())